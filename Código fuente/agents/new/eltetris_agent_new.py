@@ -123,11 +123,14 @@ class ElTetrisAgent:
         -9.34 * column_transitions +
         -7.89 * holes +
         -3.38 * well_sums
+
+        The metrics go through the state cell by cell, so the state is converted once into a list of lists (reading
+        Python lists is much faster than reading the elements of a NumPy array one at a time)
         """
 
         # Get the state and the column
         column = action[0]
-        state = action[2]
+        state = np.asarray(action[2]).tolist()
 
         return (-4.500158825082766 * self.get_landing_height(column, state) +
                 3.4181268101392694 * self.get_complete_lines(state) +
@@ -144,13 +147,9 @@ class ElTetrisAgent:
         the highest piece within the action column
         """
 
-        # Convert the state to a numpy state and transpose it
-        state = np.array(state)
-        state = state.transpose()
-
         # Loop through the column
         depth = 19
-        for position in state[column]:
+        for position in [row[column] for row in state]:
             # Check if the position is filled
             if position == 1:
                 break
@@ -166,12 +165,8 @@ class ElTetrisAgent:
         Computes how many lines are fully complete (no holes)
         """
 
-        # Convert the state to numpy
-        state = np.array(state)
-
-        # Compute which rows do not have holes
-        full_rows = np.all(state != 0, axis=1)
-        return np.sum(full_rows)
+        # Count the rows that do not have holes
+        return sum(1 for row in state if 0 not in row)
 
     def get_row_transitions(self, state):
         """
@@ -209,8 +204,7 @@ class ElTetrisAgent:
         transitions = 0
 
         # Generate the transposed state (to better access the columns)
-        state = np.array(state)
-        state = state.transpose()
+        state = list(zip(*state))
 
         # Loop through all columns
         for column in state:
@@ -232,11 +226,8 @@ class ElTetrisAgent:
 
         holes = 0
 
-        # Generate the numpy state
-        state = np.array(state)
-
         # Get the dimensions of the state
-        dimensions = state.shape
+        dimensions = (len(state), len(state[0]))
         # Loop by column, and then by row inside that column (from the bottom up)
         for x in range(dimensions[1]):
             # Store if we have found empty space (possible hole)
@@ -245,10 +236,10 @@ class ElTetrisAgent:
             for y in range(dimensions[0] - 1, -1, -1):
 
                 # Currently not on a possible hole, but we find an empty space: mark a possible hole
-                if not empty_space and state[y, x] == 0:
+                if not empty_space and state[y][x] == 0:
                     empty_space = True
                 # On a possible hole and we find a locked piece in the state: hole confirmed, add it
-                elif empty_space and state[y, x] != 0:
+                elif empty_space and state[y][x] != 0:
                     empty_space = False
                     holes += 1
 
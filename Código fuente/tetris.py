@@ -51,7 +51,8 @@
 
 import sys
 import argparse
-import copy
+import bisect
+import functools
 import random
 import os.path
 from collections import deque
@@ -93,16 +94,58 @@ play_height = 20 * block_size # 20 block-high playzone
 top_left_x = 20 + block_size // 2
 top_left_y = 0
 
+# Position on the screen of the top left corner of each cell of the playzone, where cell_positions[y][x] = position of
+# the cell (x, y). Precomputed once, so the positions are not recomputed (and allocated again) every time a cell is drawn
+cell_positions = [[(top_left_x + x * block_size, top_left_y + y * block_size) for x in range(10)] for y in range(20)]
+
+# Area of the screen covered by each cell of the playzone, where cell_rects[y][x] = area of the cell (x, y). Used to
+# update only the changed cells on the display (the rects are never modified, so the same ones are used in all frames)
+cell_rects = [[pygame.Rect(position, (block_size, block_size)) for position in row] for row in cell_positions]
+
 # Used colors
 shape_colors = [(0, 240, 0), (240, 0, 0), (0, 240, 240), (240, 240, 0), (240, 160, 0), (0, 0, 240), (160, 0, 240)]
 background_color = (170, 170, 170)
 piece_border_color = (0, 0, 0)
 playground_border_color = (75, 75, 75)
 clear_color = (240, 240, 240)
+grid_line_color = (160, 160, 160)
+
+# Palette of the grid. The grid stores the index of the color of each position instead of the color itself
+# (0 = empty position, i + 1 = block of the shape i), and the colors are only looked up when drawing
+grid_palette = [background_color] + shape_colors
+
+# Value of the bit of each column in the bitboard (used to convert the rows of the grid into bitmasks at once)
+column_bits = 1 << np.arange(10)
+
+# Pre-rendered surfaces, used to avoid issuing hundreds of draw calls every frame
+# (They are created lazily, since the display needs to be initialized first)
+
+# Surface of each block of the playzone, stored by color
+block_surfaces = {}
+
+# Surface of each block of the shadow drop (a hollow block with a transparent interior), stored by color
+shadow_surfaces = {}
+
+# Surface containing the empty playzone (with the grid lines and the borders around it)
+playzone_background = None
+
+# Surface containing the static part of the SCORE, LEVEL and LINES boxes of the HUD (the boxes and their titles)
+hud_background = None
+
+# Surface of the NEXT SHAPE panel (with the title, the box and the shape inside it), stored by (id of the shape, rotation)
+# The panel only changes when a new piece appears, so it is only rendered once for each shape
+next_shape_surfaces = {}
+
+# Fonts used by the game, stored by size
+fonts = {}
+
+# Information about the last frame drawn on the screen, used to only redraw the elements that have changed
+# (If empty, the whole screen will be redrawn in the next frame)
+drawn_frame = {}
 
 # SOUND RELATED VARIABLES #
 
-# Sound gallery
+# Sound gallery (function that plays each loaded sound on its own channel, by name)
 sound_gallery = {}
 
 # Path to the background song
@@ -217,6 +260,45 @@ T = [['.....',
 # List with all the shapes
 shapes = [S, Z, I, O, J, L, T]
 
+# Index of each shape in the list (and in shape_colors, shape_offsets, shape_masks and shape_bottoms), stored by the
+# id of the shape
+# Shapes are never copied, so they can be identified without comparing the whole codification
+shape_indexes = {id(shape): index for index, shape in enumerate(shapes)}
+
+# Offsets of the blocks of the shapes, generated once from the codifications above
+# Index i contains the offsets of shape i. For each rotation, a tuple of (x offset, y offset) pairs is stored (one per
+# block, relative to the position of the piece). The offset of the codification (2, 4) is already removed
+shape_offsets = [[tuple((j - 2, i - 4) for i, line in enumerate(shape_format) for j, column in enumerate(line)
+                        if column == '0')
+                  for shape_format in shape]
+                 for shape in shapes]
+
+# Bitmask codification of the shapes, generated once from the offsets above
+# Used to check collisions against a bitboard (a list with one integer per row of the playzone, where bit x is set if
+# the position (x, y) is occupied) without having to compare every single block
+# Index i contains the codification of shape i. For each rotation, a tuple (rows, min_x, max_x, min_y, max_y) is
+# stored, where:
+#   * rows: tuple of (y offset, mask) pairs, one per row with blocks. Bit j of the mask is set if the block with
+#     x offset j - 2 exists (so the mask never needs to be shifted to the right by a negative amount)
+#   * min_x, max_x: leftmost and rightmost x offsets of the blocks (used to check the walls of the playzone)
+#   * min_y, max_y: topmost and bottommost y offsets of the blocks (used to check the top and bottom of the playzone)
+shape_masks = [[(tuple((y_offset, sum(1 << (dx + 2) for dx, dy in offsets if dy == y_offset))
+                       for y_offset in sorted({dy for _, dy in offsets})),
+                 min(dx for dx, _ in offsets),
+                 max(dx for dx, _ in offsets),
+                 min(dy for _, dy in offsets),
+                 max(dy for _, dy in offsets))
+                for offsets in shape]
+               for shape in shape_offsets]
+
+# Lowest block of each column of the shapes, generated once from the offsets above
+# Index i contains the lowest blocks of shape i. For each rotation, a tuple of (x offset, y offset) pairs is stored
+# (one per column with blocks). Only these blocks can collide when the piece is moved straight down
+shape_bottoms = [[tuple((x_offset, max(dy for dx, dy in offsets if dx == x_offset))
+                        for x_offset in sorted({dx for dx, _ in offsets}))
+                  for offsets in shape]
+                 for shape in shape_offsets]
+
 # Initial speed of the game (time between automatic piece fall, in milliseconds)
 initial_speed = 500
 
@@ -227,6 +309,14 @@ speed_modifier = 25
 # Typically, speed increases up to 9 times
 minimum_speed = initial_speed - speed_modifier * 9
 
+# Maximum number of frames per second drawn by the AI players when the real-time clock is used
+# (The clock sleeps between frames, instead of spinning the loop drawing the same frame again and again)
+max_fps = 60
+
+# Event posted by a timer every time the piece should fall (only used by the human player, whose loop sleeps until an
+# event happens instead of constantly polling the clock)
+piece_fall_event = pygame.USEREVENT + 1
+
 # LEARNING AND AI RELATED VARIABLES #
 
 # Instantiated agent
@@ -345,6 +435,11 @@ total_epochs = 2000
 class Piece(object):
     """Tetramino (piece) used by the game."""
 
+    # Pieces are created constantly (and their attributes are accessed in every collision check), so the attributes
+    # are stored in slots instead of a per-instance dictionary
+    __slots__ = ('x', 'y', 'shape', 'color', 'color_index', 'offsets', 'masks', 'bottoms', 'rotation',
+                 'positions', 'positions_key')
+
     def __init__(self, x, y, shape):
         """
         Constructor. Creates a piece, indicating the (x, y) position and the specific shape.
@@ -354,12 +449,36 @@ class Piece(object):
         :param shape: Shape to be used.
         """
 
+        # Index of the shape in the precomputed tables (looked up only once)
+        index = shape_indexes[id(shape)]
+
         self.x = x
         self.y = y
         self.shape = shape
-        self.color = shape_colors[shapes.index(shape)]
+        self.color = shape_colors[index]
+        self.color_index = index + 1
+        self.offsets = shape_offsets[index]
+        self.masks = shape_masks[index]
+        self.bottoms = shape_bottoms[index]
         self.rotation = 0
 
+        # Last positions of the blocks generated for the piece, and the (x, y, rotation) they were generated for
+        self.positions = None
+        self.positions_key = None
+
+    def rotate(self, amount=1):
+        """
+        Rotates the piece.
+
+        The rotation is always kept between 0 and the amount of distinct rotations of the shape minus one (the
+        codifications only contain distinct rotations: 1 for O, 2 for S, Z and I, 4 for the rest), so equivalent
+        rotations are always represented by the same value.
+
+        :param amount: Amount of rotations to apply (negative values rotate the piece back).
+        """
+
+        self.rotation = (self.rotation + amount) % len(self.shape)
+
 
 #####################
 # GRAPHICAL METHODS #
@@ -369,55 +488,240 @@ def draw_manager(surface, grid, current_shape, next_shape, score=0, level=0, lin
     """
     Draws all the elements on the screen.
 
+    Only the elements that have changed since the last frame are drawn again (unless the screen has been invalidated,
+    in which case everything is drawn). The areas of the screen that have changed are returned, so only those
+    areas need to be updated on the display.
+
     :param surface: Surface used to hold all elements.
     :param grid: Matrix containing the current state of the playzone.
     :param current_shape: Shape to be drawn with a shadow drop.
-    :param grid: Grid containing all the fixed blocks.
     :param next_shape: Shape to be drawn on the NEXT SHAPE screen
     :param score: Current score of the player.
     :param level: Current level of the game.
     :param lines: Current lines cleared by the player.
+    :return: List of rects containing the areas of the screen that have changed.
     """
 
-    # Fill the background with black
-    surface.fill((15, 15, 15))
+    # Values used to check if the next shape and the HUD have changed
+    next_shape_key = (id(next_shape.shape), next_shape.rotation)
+    hud_values = (score, level, lines)
+
+    # The whole screen is drawn if it has been invalidated (or if the surface is a different one)
+    if drawn_frame.get('surface') is not surface:
+
+        # Fill the background with black
+        surface.fill((15, 15, 15))
+
+        # Draw the playzone
+        draw_playzone(surface, grid)
+
+        # Draws the shadow drop
+        shadow_positions = draw_shadow_drop(surface, current_shape, grid)
+
+        # Draw the next piece
+        draw_next_shape(surface, next_shape)
+
+        # Draw the rest of the hud
+        draw_hud(surface, score, level, lines)
 
-    # Draw the playzone
-    draw_playzone(surface, grid)
+        dirty_rects = [surface.get_rect()]
 
-    # Draws the shadow drop
-    draw_shadow_drop(surface, current_shape, grid)
+        # Store a copy of the whole grid
+        drawn_frame['grid'] = grid.copy()
 
-    # Draw the next piece
-    draw_next_shape(surface, next_shape)
+    else:
+        # Find all the cells of the playzone that have changed (comparing the whole grid at once), and draw them again
+        changed_y, changed_x = np.nonzero(grid != drawn_frame['grid'])
+        changed_cells = list(zip(changed_x.tolist(), changed_y.tolist()))
+        draw_playzone_cells(surface, grid, changed_cells)
+        drawn_frame['grid'][:] = grid
+
+        # Draws the shadow drop over the playzone
+        shadow_positions = draw_shadow_drop(surface, current_shape, grid)
+
+        # Cells that contained the previous shadow drop (and have not been drawn yet) need to be cleaned
+        changed_cells_set = set(changed_cells)
+        erased_cells = [pos for pos in drawn_frame['shadow_positions']
+                        if pos not in shadow_positions and pos not in changed_cells_set]
+        draw_playzone_cells(surface, grid, erased_cells)
+
+        # Mark all the changed cells. The shadow drop is only marked if it has moved or changed its color
+        dirty_cells = changed_cells + erased_cells
+        if shadow_positions != drawn_frame['shadow_positions'] or current_shape.color != drawn_frame['shadow_color']:
+            dirty_cells.extend(shadow_positions)
+        dirty_rects = [cell_rects[y][x] for (x, y) in dirty_cells if y >= 0]
+
+        # The elements of the HUD are only drawn if their values have changed
+        # (Only the area of the element that has been drawn is marked, instead of the whole HUD)
+        if next_shape_key != drawn_frame['next_shape']:
+            dirty_rects.append(draw_next_shape(surface, next_shape))
+
+        if hud_values != drawn_frame['hud']:
+            dirty_rects.append(draw_hud(surface, score, level, lines))
+
+    # Store the current frame
+    drawn_frame['surface'] = surface
+    drawn_frame['shadow_positions'] = shadow_positions
+    drawn_frame['shadow_color'] = current_shape.color
+    drawn_frame['next_shape'] = next_shape_key
+    drawn_frame['hud'] = hud_values
+
+    return dirty_rects
+
+
+def invalidate_screen():
+    """
+    Forces the whole screen to be drawn again in the next frame.
+
+    Must be called after drawing anything on the screen outside of draw_manager (effects, menus...)
+    """
 
-    # Draw the rest of the hud
-    draw_hud(surface, score, level, lines)
+    drawn_frame.clear()
 
 
 def draw_playzone(surface, grid):
     """
     Draws the playzone (the cells and all the blocks on it)
 
+    The empty playzone is drawn with a single blit, and then all the blocks are drawn at once using blits
+    (instead of drawing every cell of the grid individually)
+
     :param surface: Surface used to hold the playzone.
     :param grid: Matrix containing the current state of the playzone.
     """
 
-    # For each block in the grid
-    for i in range(len(grid)):
-        for j in range(len(grid[i])):
-            # Draw the block in the appropiate color
-            pygame.draw.rect(surface, grid[i][j], (top_left_x + j * block_size, top_left_y + i * block_size, block_size, block_size), 0)
-            # If not background, draw the border
-            if grid[i][j] != background_color:
-                pygame.draw.rect(surface, piece_border_color, (top_left_x + j * block_size, top_left_y + i * block_size, block_size, block_size), 1)
-            # Else, draw a light gray grid
-            else:
-                pygame.draw.rect(surface, (160, 160, 160), (top_left_x + j * block_size, top_left_y + i * block_size, block_size, block_size), 1)
+    # Draw the empty playzone (grid and borders)
+    surface.blit(get_playzone_background(), (20, 0))
+
+    # Prepare all the blocks that are not empty, and draw them at once
+    # (The surfaces are looked up by color index, and the positions are converted to Python integers once)
+    palette_blocks = [get_block_surface(color) for color in grid_palette]
+    rows, columns = np.nonzero(grid)
+    blocks = [(palette_blocks[color_index], cell_positions[i][j])
+              for i, j, color_index in zip(rows.tolist(), columns.tolist(), grid[rows, columns].tolist())]
+    surface.blits(blocks, False)
+
+
+def draw_playzone_cells(surface, grid, cells):
+    """
+    Draws only the specified cells of the playzone.
+
+    :param surface: Surface used to hold the playzone.
+    :param grid: Matrix containing the current state of the playzone.
+    :param cells: List of (x, y) positions of the cells to be drawn.
+    """
+
+    palette_blocks = [get_block_surface(color) for color in grid_palette]
+    blocks = [(palette_blocks[grid[y, x]], cell_positions[y][x]) for (x, y) in cells if y >= 0]
+    surface.blits(blocks, False)
+
+
+def get_block_surface(color):
+    """
+    Returns the pre-rendered surface of a block of the playzone with the specified color.
+
+    Surfaces are only rendered the first time they are requested, and reused afterwards.
+
+    :param color: Color of the block.
+    :return: Surface containing the block.
+    """
+
+    # Render the block if it has not been rendered yet
+    if color not in block_surfaces:
+        block = pygame.Surface((block_size, block_size)).convert()
+        block.fill(color)
+
+        # Blocks have a black border, while empty positions have a light gray grid
+        if color != background_color:
+            pygame.draw.rect(block, piece_border_color, (0, 0, block_size, block_size), 1)
+        else:
+            pygame.draw.rect(block, grid_line_color, (0, 0, block_size, block_size), 1)
+
+        block_surfaces[color] = block
+
+    return block_surfaces[color]
+
+
+def get_shadow_surface(color):
+    """
+    Returns the pre-rendered surface of a block of the shadow drop with the specified color.
+
+    Surfaces are only rendered the first time they are requested, and reused afterwards.
+
+    :param color: Color of the shadow.
+    :return: Surface containing the block (only the border is opaque, the interior is transparent).
+    """
+
+    # Render the block if it has not been rendered yet
+    if color not in shadow_surfaces:
+        block = pygame.Surface((block_size, block_size), pygame.SRCALPHA).convert_alpha()
+        block.fill((0, 0, 0, 0))
+        pygame.draw.rect(block, color, (0, 0, block_size, block_size), 5)
+
+        shadow_surfaces[color] = block
+
+    return shadow_surfaces[color]
+
+
+def get_playzone_background():
+    """
+    Returns the pre-rendered surface of the empty playzone (all the cells empty, and the borders around it).
+
+    The surface is only rendered the first time it is requested, and reused afterwards.
+
+    :return: Surface containing the empty playzone. It must be placed at (20, 0).
+    """
+
+    global playzone_background
+
+    # Render the playzone if it has not been rendered yet
+    if playzone_background is None:
+        playzone_background = pygame.Surface((play_width + block_size, screen_height)).convert()
+
+        # Draw all the empty cells
+        empty_block = get_block_surface(background_color)
+        for i in range(play_height // block_size):
+            for j in range(play_width // block_size):
+                playzone_background.blit(empty_block, (block_size // 2 + j * block_size, top_left_y + i * block_size))
+
+        # Draws two borders around the playground
+        playzone_background.fill(playground_border_color, (0, 0, block_size // 2, screen_height))
+        playzone_background.fill(playground_border_color,
+                                 (block_size // 2 + play_width, 0, block_size // 2, screen_height))
+
+    return playzone_background
+
+
+def get_font(size):
+    """
+    Returns the font used by the game with the specified size.
+
+    Fonts are only loaded the first time they are requested, and reused afterwards.
+
+    :param size: Size of the font.
+    :return: Font of the specified size.
+    """
+
+    if size not in fonts:
+        fonts[size] = pygame.font.Font(font_path, size)
+
+    return fonts[size]
+
 
-    # Draws two borders around the playground
-    pygame.draw.rect(surface, playground_border_color, (20, 0, block_size // 2, screen_height), 0)
-    pygame.draw.rect(surface, playground_border_color, (top_left_x + play_width, 0, block_size // 2, screen_height), 0)
+@functools.lru_cache(maxsize=4096)
+def render_text(text, size, color=(0, 0, 0)):
+    """
+    Renders a text using the font of the game.
+
+    Rendered texts are cached, so texts that do not change (titles, scores...) are only rendered once.
+
+    :param text: Text to be rendered.
+    :param size: Size of the font.
+    :param color: Color of the text.
+    :return: Surface containing the rendered text.
+    """
+
+    return get_font(size).render(text, 1, color)
 
 
 def draw_shadow_drop(surface, shape, grid):
@@ -427,26 +731,32 @@ def draw_shadow_drop(surface, shape, grid):
     :param surface: Surface to draw the shape on.
     :param shape: Shape to be drawn.
     :param grid: Grid containing all the fixed blocks.
+    :return: List of (x, y) positions where the shadow drop has been drawn.
     """
 
-    # Clone the shape and the grid
-    shadow_shape = copy.deepcopy(shape)
-    clones_grid = copy.deepcopy(grid)
+    # Positions of the current piece (computed once, and used to remove the piece, to avoid overlaps and to generate
+    # the positions of the shadow)
+    piece_positions = generate_shape_positions(shape)
+    shape_positions = frozenset(piece_positions)
 
-    # Remove the current piece from the grid
-    for (x, y) in generate_shape_positions(shadow_shape):
+    # Generate the bitboard of the grid once, removing the current piece from it
+    row_masks = (grid != 0).dot(column_bits).tolist()
+    for (x, y) in shape_positions:
         if y >= 0:
-            clones_grid[y][x] = background_color
+            row_masks[y] &= ~(1 << x)
+
+    # Find the position where the piece would be, and move the positions of the piece down to it
+    # (The piece itself is not modified. If it is already resting on the stack, the shadow is completely hidden by the
+    # piece, so all its blocks are discarded below)
+    distance = drop_distance(shape, row_masks)
 
-    # Find the position where the piece would be
-    while valid_space(shadow_shape, clones_grid):
-        shadow_shape.y += 1
-    shadow_shape.y -= 1
+    # Draw all the blocks currently not overlapping with the shape in the appropiate color (all of them at once)
+    shadow_positions = [(x, y + distance) for (x, y) in piece_positions if (x, y + distance) not in shape_positions]
+    shadow_block = get_shadow_surface(shape.color)
+    surface.blits([(shadow_block, (top_left_x + x * block_size, top_left_y + y * block_size))
+                   for (x, y) in shadow_positions], False)
 
-    # Draw all the blocks currently not overlapping with the shape in the appropiate color
-    for (x, y) in generate_shape_positions(shadow_shape):
-        if (x, y) not in generate_shape_positions(shape):
-            pygame.draw.rect(surface, shadow_shape.color, (top_left_x + x * block_size, top_left_y + y * block_size, block_size, block_size), 5)
+    return shadow_positions
 
 
 def draw_next_shape(surface, shape):
@@ -455,118 +765,188 @@ def draw_next_shape(surface, shape):
 
     :param surface: Surface to draw the shape on.
     :param shape: Shape to be drawn.
+    :return: Area of the surface where the panel has been drawn.
     """
 
     # Identify where to place the shapes
     hud_begin_x = top_left_x + play_width + 30
     hud_begin_y = 480
 
-    # Draw a rectangle to contain the title
-    pygame.draw.rect(surface, background_color, (hud_begin_x, hud_begin_y + 20, screen_width - hud_begin_x - 10, 60), 0)
-    pygame.draw.rect(surface, playground_border_color, (hud_begin_x, hud_begin_y + 20, screen_width - hud_begin_x - 10, 60), 5)
+    # The whole panel is blitted at once (the panel starts at the top of the title box)
+    return surface.blit(get_next_shape_surface(shape), (hud_begin_x, hud_begin_y + 20))
+
+
+def get_next_shape_surface(shape):
+    """
+    Returns the NEXT SHAPE panel for the specified shape.
+
+    Panels are only rendered the first time they are requested, and reused afterwards.
+    The panel is drawn in coordinates relative to its top left corner (the top left corner of the title box).
+
+    :param shape: Shape to be drawn inside the panel.
+    :return: Surface containing the panel.
+    """
+
+    key = (id(shape.shape), shape.rotation)
+
+    # Render the panel if it has not been rendered yet
+    if key not in next_shape_surfaces:
+        panel_width = screen_width - (top_left_x + play_width + 30) - 10
+        panel = pygame.Surface((panel_width, 250)).convert()
+        panel.fill((15, 15, 15))
 
-    # Draw the title and place it
-    font = pygame.font.Font(font_path, 20)
-    text = font.render('NEXT SHAPE', 1, (0, 0, 0))
-    surface.blit(text, (hud_begin_x + (screen_width - hud_begin_x - 10) // 2 - text.get_width() / 2, hud_begin_y + 50 - text.get_height() / 2))
+        # Draw a rectangle to contain the title
+        panel.fill(background_color, (0, 0, panel_width, 60))
+        pygame.draw.rect(panel, playground_border_color, (0, 0, panel_width, 60), 5)
 
-    # Draw a rectangle to contain the shape below
-    pygame.draw.rect(surface, background_color, (hud_begin_x + 10, hud_begin_y + 90, screen_width - hud_begin_x - 30, 180), 0)
-    pygame.draw.rect(surface, playground_border_color, (hud_begin_x + 10, hud_begin_y + 90, screen_width - hud_begin_x - 30, 180), 5)
+        # Draw the title and place it
+        text = render_text('NEXT SHAPE', 20)
+        panel.blit(text, (panel_width // 2 - text.get_width() / 2, 30 - text.get_height() / 2))
 
-    # Draw the shape in the box
-    shape_format = shape.shape[shape.rotation % len(shape.shape)]
+        # Draw a rectangle to contain the shape below
+        panel.fill(background_color, (10, 70, panel_width - 20, 180))
+        pygame.draw.rect(panel, playground_border_color, (10, 70, panel_width - 20, 180), 5)
 
-    sx = top_left_x + play_width + 40
-    sy = hud_begin_y + 100
+        # Draw the shape in the box (all the blocks at once)
+        # (The offsets do not include the offset of the codification, so it is added back)
+        block = get_block_surface(shape.color)
+        panel.blits([(block, (10 + (x_offset + 2) * block_size, 80 + (y_offset + 4) * block_size))
+                     for x_offset, y_offset in shape.offsets[shape.rotation]], False)
 
-    for i, line in enumerate(shape_format):
-        row = list(line)
-        for j, column in enumerate(row):
-            if column == '0':
-                pygame.draw.rect(surface, shape.color, (sx + j*block_size, sy + i * block_size, block_size, block_size), 0)
-                pygame.draw.rect(surface, piece_border_color, (sx + j * block_size, sy + i * block_size, block_size, block_size), 1)
+        next_shape_surfaces[key] = panel
+
+    return next_shape_surfaces[key]
 
 
 def draw_hud(surface, score, level, lines):
     """
     Draw the rest of the elements of the HUD (score, level, lines)
 
+    The boxes and their titles never change, so they are drawn at once from a pre-rendered surface, and only the values
+    are written over them.
+
     :param surface: Surface on which to draw the elements.
     :param score: Current score of the player.
     :param level: Current level of the player.
     :param lines: Current amount of cleared lines by the player
+    :return: Area of the surface where the elements have been drawn.
     """
 
     # Identify where to place the HUD
     hud_begin_x = top_left_x + play_width + 30
+    center_x = hud_begin_x + (screen_width - hud_begin_x - 10) // 2
 
-    # Create the font
-    font = pygame.font.Font(font_path, 20)
+    # Draw the boxes and their titles (the surface starts at the top left corner of the SCORE box)
+    hud_area = surface.blit(get_hud_background(), (hud_begin_x - 10, 75))
 
+    # Write the values and print them
     # SCORE
-    score_y = 75
+    score_score = render_text(str(score), 20)
+    surface.blit(score_score, (center_x - score_score.get_width() / 2, 75 + 65 - score_score.get_height() / 2))
 
-    # Score uses its own font
-    score_font = pygame.font.Font(font_path, 30)
+    # LEVEL
+    level_score = render_text(str(level), 20)
+    surface.blit(level_score, (center_x - level_score.get_width() / 2, 250 + 55 - level_score.get_height() / 2))
 
-    # Draw the rectangle
-    pygame.draw.rect(surface, background_color, (hud_begin_x - 10, score_y, screen_width - hud_begin_x + 10, 90), 0)
-    pygame.draw.rect(surface, playground_border_color, (hud_begin_x - 10, score_y, screen_width - hud_begin_x + 10, 90), 5)
+    # LINES
+    lines_score = render_text(str(lines), 20)
+    surface.blit(lines_score, (center_x - lines_score.get_width() / 2, 350 + 55 - lines_score.get_height() / 2))
 
-    # Write the text and print it
-    score_text = score_font.render('SCORE', 1, (0, 0, 0))
-    score_score = font.render(str(score), 1, (0, 0, 0))
+    return hud_area
 
-    surface.blit(score_text, (hud_begin_x + (screen_width - hud_begin_x - 10) // 2 - score_text.get_width() / 2, score_y + 30 - score_text.get_height() / 2))
-    surface.blit(score_score, (hud_begin_x + (screen_width - hud_begin_x - 10) // 2 - score_score.get_width() / 2, score_y + 65 - score_score.get_height() / 2))
 
-    # LEVEL
-    level_y = 250
-    # Draw the rectangle
-    pygame.draw.rect(surface, background_color, (hud_begin_x, level_y, screen_width - hud_begin_x - 10, 80), 0)
-    pygame.draw.rect(surface, playground_border_color, (hud_begin_x, level_y, screen_width - hud_begin_x - 10, 80), 5)
+def get_hud_background():
+    """
+    Returns the pre-rendered surface of the static part of the HUD (the SCORE, LEVEL and LINES boxes and their titles).
 
-    # Write the text and print it
-    level_text = font.render('LEVEL', 1, (0, 0, 0))
-    level_score = font.render(str(level), 1, (0, 0, 0))
+    The surface is only rendered the first time it is requested, and reused afterwards.
 
-    surface.blit(level_text, (hud_begin_x + (screen_width - hud_begin_x - 10) // 2 - level_text.get_width() / 2, level_y + 25 - level_text.get_height() / 2))
-    surface.blit(level_score, (hud_begin_x + (screen_width - hud_begin_x - 10) // 2 - level_score.get_width() / 2, level_y + 55 - level_score.get_height() / 2))
+    :return: Surface containing the boxes. It must be placed at the top left corner of the SCORE box.
+    """
 
-    # LINES
-    lines_y = 350
-    # Draw the rectangle
-    pygame.draw.rect(surface, background_color, (hud_begin_x, lines_y, screen_width - hud_begin_x - 10, 80), 0)
-    pygame.draw.rect(surface, playground_border_color, (hud_begin_x, lines_y, screen_width - hud_begin_x - 10, 80), 5)
+    global hud_background
 
-    # Write the text and print it
-    lines_text = font.render('LINES', 1, (0, 0, 0))
-    lines_score = font.render(str(lines), 1, (0, 0, 0))
+    # Render the boxes if they have not been rendered yet
+    if hud_background is None:
+        # Identify where to place the HUD
+        # (Everything is drawn relative to the top left corner of the SCORE box, which is the origin of the surface)
+        hud_begin_x = top_left_x + play_width + 30
+        origin_x = hud_begin_x - 10
+        origin_y = 75
+        center_x = hud_begin_x + (screen_width - hud_begin_x - 10) // 2 - origin_x
 
-    surface.blit(lines_text, (hud_begin_x + (screen_width - hud_begin_x - 10) // 2 - lines_text.get_width() / 2,
-                              lines_y + 25 - lines_text.get_height() / 2))
-    surface.blit(lines_score, (hud_begin_x + (screen_width - hud_begin_x - 10) // 2 - lines_score.get_width() / 2,
-                               lines_y + 55 - lines_score.get_height() / 2))
+        # The surface goes from the top of the SCORE rectangle to the bottom of the LINES rectangle
+        hud_background = pygame.Surface((screen_width - origin_x, 350 + 80 - origin_y)).convert()
+        hud_background.fill((15, 15, 15))
 
+        # SCORE
+        score_y = 75 - origin_y
 
-def draw_clear_row(surface, lines):
+        # Draw the rectangle
+        hud_background.fill(background_color, (0, score_y, screen_width - hud_begin_x + 10, 90))
+        pygame.draw.rect(hud_background, playground_border_color, (0, score_y, screen_width - hud_begin_x + 10, 90), 5)
+
+        # Write the title and print it (score title uses a bigger font)
+        score_text = render_text('SCORE', 30)
+        hud_background.blit(score_text, (center_x - score_text.get_width() / 2,
+                                         score_y + 30 - score_text.get_height() / 2))
+
+        # LEVEL
+        level_y = 250 - origin_y
+
+        # Draw the rectangle
+        hud_background.fill(background_color, (10, level_y, screen_width - hud_begin_x - 10, 80))
+        pygame.draw.rect(hud_background, playground_border_color, (10, level_y, screen_width - hud_begin_x - 10, 80), 5)
+
+        # Write the title and print it
+        level_text = render_text('LEVEL', 20)
+        hud_background.blit(level_text, (center_x - level_text.get_width() / 2,
+                                         level_y + 25 - level_text.get_height() / 2))
+
+        # LINES
+        lines_y = 350 - origin_y
+
+        # Draw the rectangle
+        hud_background.fill(background_color, (10, lines_y, screen_width - hud_begin_x - 10, 80))
+        pygame.draw.rect(hud_background, playground_border_color, (10, lines_y, screen_width - hud_begin_x - 10, 80), 5)
+
+        # Write the title and print it
+        lines_text = render_text('LINES', 20)
+        hud_background.blit(lines_text, (center_x - lines_text.get_width() / 2,
+                                         lines_y + 25 - lines_text.get_height() / 2))
+
+    return hud_background
+
+
+def draw_clear_row(surface, lines, dirty_rects=()):
     """
     Draws an effect when a line is cleared.
 
     :param surface: Surface on which to draw the effect.
     :param lines: List containing all of the cleared lines.
+    :param dirty_rects: Areas of the screen drawn before the effect that have not been updated on the screen yet.
     """
 
     # Draws the effect on all cleared lines
+    # (The whole line is filled at once)
     for i in lines:
-        for j in range(0, 10):
-            pygame.draw.rect(surface, clear_color, (top_left_x + j * block_size, top_left_y + i * block_size, block_size, block_size), 0)
-        pygame.draw.rect(surface, clear_color, (top_left_x, top_left_y + i*block_size, play_width, block_size), 3)
+        surface.fill(clear_color, (top_left_x, top_left_y + i * block_size, play_width, block_size))
 
-    # Print the effect on the screen for a bit
-    pygame.display.flip()
-    pygame.time.wait(300)
+    # Print the effect on the screen for a bit (only the cleared lines and the pending areas are updated on the screen)
+    pygame.display.update(list(dirty_rects) +
+                          [pygame.Rect(top_left_x, top_left_y + i * block_size, play_width, block_size) for i in lines])
+
+    # While the agent is learning, the game is not stopped to show the effect
+    # (The wait would only slow down the training, without providing anything to the agent)
+    if not ai_learning:
+        pygame.time.wait(300)
+
+    # The effect has been drawn over the cleared lines, so their cells will need to be drawn again
+    # Instead of invalidating the whole screen, the cells are marked as changed in the last drawn frame (using a color
+    # index that does not exist), so the next frame only draws those cells again
+    # (If no frame has been drawn yet, the whole screen will be drawn anyway)
+    if 'grid' in drawn_frame:
+        drawn_frame['grid'][lines] = 255
 
 
 def draw_game_over_effect(surface):
@@ -577,24 +957,27 @@ def draw_game_over_effect(surface):
     """
 
     # Draws the effect on all lines (from the bottom row to the first one), waiting a bit on each one
+    # Only the line that has been drawn is updated on the screen
+    block = get_block_surface((200, 200, 200))
     for i in range((play_height // block_size) - 1, -1, -1):
-        for j in range(0, (play_width // block_size)):
-            pygame.draw.rect(surface, (200, 200, 200), (top_left_x + j * block_size, top_left_y + i * block_size, block_size, block_size), 0)
-            pygame.draw.rect(surface, piece_border_color,(top_left_x + j * block_size, top_left_y + i * block_size, block_size, block_size), 1)
-        pygame.display.flip()
+        surface.blits([(block, (top_left_x + j * block_size, top_left_y + i * block_size))
+                       for j in range(0, (play_width // block_size))], False)
+        pygame.display.update(pygame.Rect(top_left_x, top_left_y + i * block_size, play_width, block_size))
         pygame.time.wait(40)
 
     pygame.time.wait(300)
 
-    # Draws GAME OVER on the play zone
-    font = pygame.font.Font(font_path, 40)
-    text = font.render('GAME OVER!', 1, (15, 15, 15))
-    surface.blit(text, (top_left_x + (play_width // 2) - text.get_width() / 2, screen_height // 2 - text.get_height() / 2))
-    pygame.display.flip()
+    # Draws GAME OVER on the play zone (the text is only rendered the first time)
+    text = render_text('GAME OVER!', 40, (15, 15, 15))
+    pygame.display.update(surface.blit(text, (top_left_x + (play_width // 2) - text.get_width() / 2,
+                                              screen_height // 2 - text.get_height() / 2)))
 
     # Waits a bit of extra time (for good measure)
     pygame.time.wait(1500)
 
+    # The effect has been drawn over the playzone, so it will need to be drawn again
+    invalidate_screen()
+
 
 def draw_main_menu(surface):
     """
@@ -616,37 +999,35 @@ def draw_main_menu(surface):
     surface.fill((15, 15, 15))
 
     # Creates the title
-    title_font = pygame.font.Font(font_path, 100)
-    title_text = title_font.render('TETRIS', 1, (255, 255, 255))
+    title_text = render_text('TETRIS', 100, (255, 255, 255))
     surface.blit(title_text, (screen_width_menu / 2 - title_text.get_width() / 2, 150 - title_text.get_height() / 2))
 
     # Create the subtitle
-    subtitle_font = pygame.font.Font(font_path, 30)
-    subtitle_text = subtitle_font.render('FOR DEEP-Q LEARNING', 1, (255, 255, 255))
+    subtitle_text = render_text('FOR DEEP-Q LEARNING', 30, (255, 255, 255))
     surface.blit(subtitle_text, (screen_width_menu / 2 - subtitle_text.get_width() / 2, 225 - subtitle_text.get_height() / 2))
 
     # Create the start message
-    start_font = pygame.font.Font(font_path, 30)
-    start_text = start_font.render('PRESS ANY', 1, (255, 255, 255))
+    start_text = render_text('PRESS ANY', 30, (255, 255, 255))
     surface.blit(start_text, (screen_width_menu / 2 - start_text.get_width() / 2, 450 - start_text.get_height() / 2))
-    start_text2 = start_font.render('KEY TO START!', 1, (255, 255, 255))
+    start_text2 = render_text('KEY TO START!', 30, (255, 255, 255))
     surface.blit(start_text2, (screen_width_menu / 2 - start_text2.get_width() / 2, 500 - start_text2.get_height() / 2))
 
     # Create the developed disclaimer
-    developed_font = pygame.font.Font(font_path, 15)
-    developed_text = developed_font.render('DEVELOPED BY LUNA JIMENEZ FERNANDEZ', 1, (255, 255, 255))
+    developed_text = render_text('DEVELOPED BY LUNA JIMENEZ FERNANDEZ', 15, (255, 255, 255))
     surface.blit(developed_text, (screen_width_menu / 2 - developed_text.get_width() / 2, 750 - developed_text.get_height() / 2))
 
     # If the player is an AI, indicate it on the main screen
     if ai_player:
-        ai_font = pygame.font.Font(font_path, 15)
-        ai_text = ai_font.render('AI PLAYER ACTIVE', 1, (255, 255, 255))
+        ai_text = render_text('AI PLAYER ACTIVE', 15, (255, 255, 255))
         surface.blit(ai_text,
                      (screen_width_menu / 2 - ai_text.get_width() / 2, 625 - ai_text.get_height() / 2))
 
     # Draw the screen
     pygame.display.flip()
 
+    # The menu has been drawn over the game screen, so it will need to be drawn again
+    invalidate_screen()
+
 
 #################
 # SOUND METHODS #
@@ -656,15 +1037,25 @@ def prepare_sounds(list_sounds):
     """
     Creates a sound gallery with all the initialized Sounds.
 
+    Each sound is played on its own channel, reserved for it (so the mixer does not need to look for a free channel
+    every time a sound is played, and a sound that is repeated quickly restarts on its channel instead of taking over
+    more channels). The gallery stores the function that plays each sound on its channel, so playing a sound is a
+    single call.
+
     :param list_sounds: List containing the name and path of all the sound files.
+    :return: Dictionary with the function that plays each sound, where Key = Name of the sound.
     """
 
     dictionary_sounds = {}
 
-    # For each sound in path, initialize it
-    for (name, path) in list_sounds:
+    # Reserve one channel per sound (reserved channels are never picked by the mixer for any other sound)
+    pygame.mixer.set_reserved(len(list_sounds))
+
+    # For each sound in path, initialize it and bind it to its channel
+    for channel_id, (name, path) in enumerate(list_sounds):
         proper_path = os.path.join(".", "sounds", path)
-        dictionary_sounds[name] = pygame.mixer.Sound(proper_path)
+        dictionary_sounds[name] = functools.partial(pygame.mixer.Channel(channel_id).play,
+                                                    pygame.mixer.Sound(proper_path))
 
     return dictionary_sounds
 
@@ -676,24 +1067,30 @@ def play_sound(sound):
     :param sound: Name of the sound to be played
     """
 
+    # (The sound is only looked up once, instead of checking if it exists and then accessing it)
     if sound_active:
-        if sound in sound_gallery:
-            sound_gallery[sound].play()
+        play = sound_gallery.get(sound)
+        if play is not None:
+            play()
 
 
 def play_song():
-    """Starts playing the background music on loop (if sound is active)."""
+    """
+    Starts playing the background music on loop (if sound is active).
+
+    The song has already been loaded when the game started, so it is not loaded again for every game.
+    """
 
     if sound_active:
-        pygame.mixer.music.load(path_song)
         pygame.mixer.music.play(-1)
 
 
 def stop_sounds():
-    """Stops playing all sounds."""
+    """Stops playing all sounds (if sound is active, since the mixer is not initialized otherwise)."""
 
-    pygame.mixer.pause()
-    pygame.mixer.music.stop()
+    if sound_active:
+        pygame.mixer.pause()
+        pygame.mixer.music.stop()
 
 
 ####################
@@ -703,54 +1100,65 @@ def stop_sounds():
 def bag_randomizer():
     """
     Generates a random set of pieces. All seven pieces are included in a random order.
-    :return: A randomized list of pieces.
+    :return: A randomized queue of pieces.
     """
 
     # Get the list of pieces and randomly shuffle it
-    shuffled_list = copy.deepcopy(shapes)
+    # (A shallow copy is enough: the codifications of the shapes are never modified, so they can be shared)
+    # The global random generator is used, so the sequence of pieces still depends on the seed of the game
+    shuffled_list = list(shapes)
     random.shuffle(shuffled_list)
 
-    return shuffled_list
+    # The pieces are taken from the front, so they are stored in a queue
+    return deque(shuffled_list)
 
 
 def get_shape(shapes_list):
     """
     Gets a shape from the shapes list. If it is empty, refills it using a bag randomizer.
 
-    :param shapes_list: List of shapes from which to get the shape.
-    :return: The shape and the modified list of shapes.
+    :param shapes_list: Queue of shapes from which to get the shape.
+    :return: The shape and the modified queue of shapes.
     """
 
     # Check if the bag of pieces is empty
-    if len(shapes_list) == 0:
+    if not shapes_list:
         # If it is, refill it with the seven pieces (in a random order)
         shapes_list = bag_randomizer()
 
-    # Take the top value from the list and create the shape
-    shape = shapes_list.pop(0)
+    # Take the top value from the queue (without moving the rest of the values) and create the shape
+    shape = shapes_list.popleft()
     piece = Piece(5, 0, shape)
 
     return piece, shapes_list
 
 
-def create_grid(locked_positions={}):
+def create_grid(locked_positions=None):
     """
     Generates the grid (the inner codification of the playzone).
 
     :param locked_positions: A dictionary containing the position of all locked pieces (including the current piece).
-    Key = (x, y) position of the piece. Value = Color of the piece.
-    :return: Matrix containing all the colors of the grid, where matrix[y][x] = color in the position (x, y).
+    Key = y * 10 + x, where (x, y) is the position of the piece. Value = Index of the color of the piece in grid_palette.
+    If not specified, an empty grid is generated.
+    :return: NumPy matrix containing the index of the color of every position of the grid (0 if the position is empty),
+    where matrix[y, x] = color index in the position (x, y).
     """
 
-    # Grid (playzone) is represented as a matrix of colours
-    # Initially all colors (empty positions) are of the background color
-    grid = [[background_color for _ in range(10)] for _ in range(20)]
+    # Grid (playzone) is represented as a matrix of color indexes (stored as bytes)
+    # Initially all positions are empty
+    grid = np.zeros((20, 10), dtype=np.uint8)
+
+    # (No dictionary is used as the default value, since it would be shared between all calls)
+    if locked_positions is None:
+        return grid
 
     # For all fixed blocks (locked positions), color the corresponding position to the appropiate color
-    for i in range(len(grid)):
-        for j in range(len(grid[i])):
-            if (j, i) in locked_positions:
-                grid[i][j] = locked_positions[(j, i)]
+    # All the positions are decoded and written at once (positions above the playzone are ignored)
+    keys = np.fromiter(locked_positions.keys(), dtype=int, count=len(locked_positions))
+    color_indexes = np.fromiter(locked_positions.values(), dtype=np.uint8, count=len(locked_positions))
+    rows, columns = np.divmod(keys, 10)
+    visible = rows >= 0
+    grid[rows[visible], columns[visible]] = color_indexes[visible]
 
     return grid
 
@@ -759,75 +1167,162 @@ def generate_shape_positions(shape):
     """
     Converts the current shape position into a list of usable (x, y) coordinates.
 
+    The positions are requested several times for the same position of the shape (e.g. to place it in the grid and to
+    draw its shadow in the same frame), so the last generated positions are kept in the shape and reused until it is
+    moved or rotated. The returned list is shared, so it must not be modified.
+
     :param shape: Shape to obtain the position of.
     :return: List containing the (x, y) coordinates of all the blocks of the shape.
     """
 
-    # List of positions to be returned
-    positions = []
+    # The offsets of the blocks are precomputed, so they only need to be added to the position of the shape
+    key = (shape.x, shape.y, shape.rotation)
+    if shape.positions_key != key:
+        shape.positions = [(shape.x + x_offset, shape.y + y_offset)
+                           for x_offset, y_offset in shape.offsets[shape.rotation]]
+        shape.positions_key = key
+
+    return shape.positions
+
+
+def create_row_masks(locked_positions):
+    """
+    Generates the bitboard of the playzone (a bitmask of occupied positions for each row).
+
+    :param locked_positions: A dictionary containing the position of all locked pieces.
+    Key = y * 10 + x, where (x, y) is the position of the piece. Value = Index of the color of the piece.
+    :return: List of 20 integers, where bit x of the element y is set if the position (x, y) is occupied.
+    """
+
+    row_masks = [0] * 20
 
-    # Obtain the codification of the current shape
-    shape_format = shape.shape[shape.rotation % len(shape.shape)]
+    # Set the bit of every locked position (positions above the playzone are ignored)
+    for key in locked_positions:
+        y, x = divmod(key, 10)
+        if y >= 0:
+            row_masks[y] |= 1 << x
 
-    # Explores the codification of the shape, line by line
-    for i, line in enumerate(shape_format):
-        row = list(line)
-        for j, column in enumerate(row):
-            # If a 0 is found (a block), add the position to the list of positions
-            if column == '0':
-                positions.append((shape.x + j, shape.y + i))
+    return row_masks
 
-    # Since the codifications have an offset, remove it to obtain the true position
-    for i, pos in enumerate(positions):
-        positions[i] = (pos[0] - 2, pos[1] - 4)
 
-    return positions
+def update_row_masks(row_masks, shape_pos, lines_cleared, locked_positions):
+    """
+    Updates the bitboard of the playzone after locking a piece (the bitboard is modified in place).
 
+    Instead of generating the whole bitboard again, only the bits of the locked piece are set, and the cleared rows
+    are removed (moving all the rows above them down, the same way as in clear_rows).
 
-def valid_space(shape, grid):
+    :param row_masks: Bitboard of the playzone before locking the piece (as generated by create_row_masks).
+    :param shape_pos: List of (x, y) positions of the piece that has just been locked.
+    :param lines_cleared: Sorted list of lines cleared after locking the piece (as returned by clear_rows).
+    :param locked_positions: Dictionary of locked positions (already updated by clear_rows).
     """
-    Checks if the position of the shape would be valid in the current grid.
+
+    # Set the bit of every block of the locked piece (blocks above the playzone are ignored)
+    for x, y in shape_pos:
+        if y >= 0:
+            row_masks[y] |= 1 << x
+
+    if lines_cleared:
+        # Remove the cleared rows from the bottom up, so the indexes of the remaining rows to remove do not change
+        for y in reversed(lines_cleared):
+            del row_masks[y]
+
+        # Add the new rows on top. They can only contain blocks that were locked above the playzone
+        # (The keys of the new rows are consecutive, from 0 to 10 * rows - 1, so only those keys are looked up instead
+        # of going through all the locked positions)
+        new_rows = [0] * len(lines_cleared)
+        for key in range(len(lines_cleared) * 10):
+            if key in locked_positions:
+                y, x = divmod(key, 10)
+                new_rows[y] |= 1 << x
+        row_masks[0:0] = new_rows
+
+
+def valid_space(shape, row_masks):
+    """
+    Checks if the position of the shape would be valid in the current bitboard.
+
+    Each row of the shape is checked at once using bitwise operations.
 
     :param shape: Shape to check if the position is valid.
-    :param grid: Grid containing the state of the playzone.
+    :param row_masks: Bitboard of the playzone (as generated by create_row_masks).
     :return: True if the position is valid, False otherwise.
     """
 
-    # Obtain a list with all the valid positions (positions that have the background color)
-    accepted_pos = [[(j, i) for j in range(10) if grid[i][j] == background_color] for i in range(20)]
-    # Add an extra four layers on top (index from -4 to -1), to account for pieces above the playing area
-    # This is added to ensure that pieces that just spawned can move only in legal positions
-    extra_lines = [[(j, i) for j in range(10)] for i in range(-4, 0)]
-    accepted_pos.extend(extra_lines)
-    # Flatten everything
-    accepted_pos = [j for sub in accepted_pos for j in sub]
+    rows, min_x, max_x, min_y, max_y = shape.masks[shape.rotation]
+
+    # Check that the shape is within the walls of the playzone
+    if shape.x + min_x < 0 or shape.x + max_x > 9:
+        return False
 
-    # Obtain the coordinates of the shape
-    formatted = generate_shape_positions(shape)
+    # Check that the shape is within the playzone vertically (or within the four extra rows on top of it)
+    if shape.y + max_y > 19 or shape.y + min_y < -4:
+        return False
 
-    # Check if the coordinates of the shape are in the accepted position
-    for pos in formatted:
-        # Position invalid
-        if pos not in accepted_pos:
+    # Move the mask of each row to the position of the shape and check if any of the positions is occupied
+    # (The offset of the codification is removed with the right shift. Rows above the playzone are always empty)
+    for y_offset, mask in rows:
+        y = shape.y + y_offset
+        if y > -1 and row_masks[y] & ((mask << shape.x) >> 2):
             return False
 
     return True
 
 
-def check_defeat(positions):
+def drop_distance(shape, row_masks):
     """
-    Check if the game is over (a piece has reached the top of the screen)
+    Computes how many rows the shape can be moved straight down from its current position.
 
-    :param positions: Dictionary of locked positions, where key = (x, y) position and value = color of the position.
+    Instead of moving the shape down one row at a time and checking the whole shape each time, only the lowest block of
+    each column is checked, looking for the first occupied position below it.
+
+    :param shape: Shape to be dropped.
+    :param row_masks: Bitboard of the playzone (as generated by create_row_masks).
+    :return: Amount of rows the shape can be moved down (-1 if the current position of the shape is not valid).
+    """
+
+    # A shape in an invalid position cannot be dropped
+    # (-1 is returned to keep the same behaviour as lowering the shape until an invalid position is reached)
+    if not valid_space(shape, row_masks):
+        return -1
+
+    # The shape can be moved down at most until it touches the bottom of the playzone
+    distance = 19 - shape.y - shape.masks[shape.rotation][4]
+
+    # For every column, look for the first occupied position below the lowest block (only within the current distance)
+    for x_offset, y_offset in shape.bottoms[shape.rotation]:
+        column_bit = 1 << (shape.x + x_offset)
+        for fall in range(distance):
+            y = shape.y + y_offset + fall + 1
+            if y > -1 and row_masks[y] & column_bit:
+                distance = fall
+                break
+
+    return distance
+
+
+def check_defeat(shape_pos, lines_cleared):
+    """
+    Check if the game is over (the piece that has just been locked has reached the top of the screen)
+
+    Only the locked piece needs to be checked, since all the other locked positions were already below the top.
+    Its blocks are moved down by the amount of cleared lines below them (the same way as in clear_rows).
+
+    :param shape_pos: List of (x, y) positions of the piece that has just been locked.
+    :param lines_cleared: Sorted list of lines cleared after locking the piece (as returned by clear_rows).
     :return: True if the game is over, False otherwise.
     """
 
-    # Loop over all the keys
-    for pos in positions:
-        # If any locked position has y < 1 (0 or greater), the top has been reached and the game is over
-        if pos[1] < 1:
-            return True
-    return False
+    # Blocks can only move down when lines are cleared, so if the highest block of the piece is already below the top,
+    # the game cannot be over (this is the case for almost every piece)
+    if min(y for _, y in shape_pos) >= 1:
+        return False
+
+    # If any block has y < 1 (0 or greater) after clearing the lines, the top has been reached and the game is over
+    # (Blocks of cleared lines have been removed)
+    return any(y not in lines_cleared and y + len(lines_cleared) - bisect.bisect_right(lines_cleared, y) < 1
+               for _, y in shape_pos)
 
 
 def clear_rows(grid, locked):
@@ -835,51 +1330,64 @@ def clear_rows(grid, locked):
     Removes all cleared rows from the grid.
 
     :param grid: Matrix representing the current state of the playzone.
-    :param locked: Dictionary of locked positions, where Key = (x, y) coordinates of the piece.
+    :param locked: Dictionary of locked positions, where Key = y * 10 + x, (x, y) being the coordinates of the piece.
     :return: List of cleared lines
     """
 
-    # Removed lines
-    removed_lines = []
+    # Compute which lines to remove (rows with no empty positions are full of blocks), checking all rows at once
+    full_rows = grid.all(axis=1).tolist()
+    removed_lines = [y for y in range(len(full_rows)) if full_rows[y]]
 
-    # Compute which lines to remove
-    # For all values from first to the last row
-    for i in range(0, len(grid)):
-        row = grid[i]
-        # If there is no background color (the row is full of blocks)
-        if background_color not in row:
-            # Add the current row to the list of removed rows
-            removed_lines.append(i)
+    # If lines have been removed, update the locked positions with the new y values
+    if len(removed_lines) > 0:
+        # Compute, in a single pass from the bottom row to the top one, how much the key of each block of the row has
+        # to grow (moving a block down a row is the same as adding 10 to its key). Removed rows are marked with None,
+        # since their blocks are deleted. The last four values belong to the rows above the playzone (y = -4 to -1,
+        # which are accessed with negative indexes), and are moved down by all removed lines
+        key_shifts = [None] * len(full_rows) + [len(removed_lines) * 10] * 4
+        shift = 0
+        for y in range(len(full_rows) - 1, -1, -1):
+            if full_rows[y]:
+                shift += 10
+            else:
+                key_shifts[y] = shift
 
-            # Remove all blocks in the line
-            for j in range(len(row)):
-                try:
-                    del locked[(j, i)]
-                except:
-                    continue
+        # All blocks are moved at once into a new dictionary (each block is read and written only once), so no
+        # positions are crushed while shifting
+        shifted_locked = {}
+        for key, color_index in locked.items():
+            shift = key_shifts[key // 10]
+            if shift is not None:
+                shifted_locked[key + shift] = color_index
 
-    # If lines have been removed, update the necessary lines in the grid with the new y values
-    if len(removed_lines) > 0:
-        # Explored in reverse order
-        # (otherwise, we would crush previous positions)
+        # Update the original dictionary with the new positions
+        locked.clear()
+        locked.update(shifted_locked)
 
-        # Note: [::-1] is an iterator, that basically allows to access the sorted list in an inverse order
-        # (from the biggest to the smallest value)
-        # Iterators use the format [start:end:step]
-        for key in sorted(list(locked), key=lambda x: x[1])[::-1]:
-            x, y = key
+    return removed_lines
 
-            # Compute the offset of the line
-            offset = 0
-            for line in removed_lines:
-                if line > y:
-                    offset += 1
 
-            # Update the value of blocks
-            new_key = (x, y + offset)
-            locked[new_key] = locked.pop(key)
+def remove_grid_rows(grid, removed_lines, locked_positions):
+    """
+    Removes the cleared rows from the grid, moving all the rows above them down (the grid is modified in place).
 
-    return removed_lines
+    :param grid: Matrix representing the current state of the playzone.
+    :param removed_lines: Sorted list of cleared lines (as returned by clear_rows).
+    :param locked_positions: Dictionary of locked positions (already updated by clear_rows).
+    """
+
+    # Move all the remaining rows down at once
+    grid[len(removed_lines):] = np.delete(grid, removed_lines, axis=0)
+
+    # Empty the new rows on top. They can only contain blocks that were locked above the playzone
+    # (The keys of the new rows are consecutive, from 0 to 10 * rows - 1, so only those keys are looked up instead of
+    # going through all the locked positions)
+    grid[:len(removed_lines)] = 0
+    for key in range(len(removed_lines) * 10):
+        color_index = locked_positions.get(key)
+        if color_index is not None:
+            y, x = divmod(key, 10)
+            grid[y, x] = color_index
 
 
 def compute_score(lines_cleared, lowest_y, level):
@@ -895,6 +1403,11 @@ def compute_score(lines_cleared, lowest_y, level):
     * 1 if no lines have been cleared
     * 10 * 2^(lines_cleared-1) if lines have been cleared (so 10, 20, 40 or 80 points)
 
+    The power of two is computed directly as a bit shift (2^(lines_cleared - 1) = 1 << (lines_cleared - 1)).
+
+    :param lines_cleared: Amount of lines cleared by the locked piece.
+    :param lowest_y: Lowest Y position reached by the locked piece.
+    :param level: Current level of the game.
     :return: Computed score
     """
 
@@ -906,7 +1419,7 @@ def compute_score(lines_cleared, lowest_y, level):
             return 1
         else:
             # Lines cleared
-            return 10 * (2 ** (lines_cleared - 1))
+            return 10 * (1 << (lines_cleared - 1))
     else:
         # INACTIVE: Use the standard scoring system
         if lines_cleared == 0:
@@ -914,7 +1427,7 @@ def compute_score(lines_cleared, lowest_y, level):
             return lowest_y * (level + 1)
         else:
             # Lines cleared
-            return 100 * (2 ** (lines_cleared - 1)) * (level + 1)
+            return 100 * (1 << (lines_cleared - 1)) * (level + 1)
 
 
 #################
@@ -938,28 +1451,19 @@ def draw_state(surface, state, initial_x, initial_y, grid_block_size):
     :param grid_block_size: Size (in pixels) of each cell of the grid
     """
 
-    # Draw a rectangle behind the state
+    # Draw a frame around the state (the inside is completely covered by the cells)
     pygame.draw.rect(surface, playground_border_color,
-                     (initial_x - 5, initial_y - 5, grid_block_size * 10 + 10, grid_block_size * 20 + 10), 0)
-
-    # Loop through all elements of the state
-    for (y, x), element in np.ndenumerate(state):
+                     (initial_x - 5, initial_y - 5, grid_block_size * 10 + 10, grid_block_size * 20 + 10), 5)
 
-        # Set the color depending on the value of the element
-        # (0 is black, 1 is white)
-        if element == 0:
-            color = (0, 0, 0)
-        else:
-            color = (255, 255, 255)
+    # Copy the whole state into a surface with one pixel per cell (black if empty, white if occupied)
+    # (Surface arrays are indexed as [x, y], so the state is transposed)
+    state_surface = pygame.Surface((10, 20))
+    pygame.surfarray.blit_array(state_surface,
+                                (np.asarray(state) != 0).T * np.uint32(state_surface.map_rgb((255, 255, 255))))
 
-        # Draw the actual square in the appropiate position
-        pygame.draw.rect(surface,
-                         color,
-                         (initial_x + x * grid_block_size,
-                          initial_y + y * grid_block_size,
-                          grid_block_size,
-                          grid_block_size),
-                         0)
+    # Scale it up so each pixel becomes a cell of the grid, and draw all the cells at once
+    surface.blit(pygame.transform.scale(state_surface, (grid_block_size * 10, grid_block_size * 20)),
+                 (initial_x, initial_y))
 
 
 def draw_ai_player_old_information(surface, current_state, q_values, action, actions_taken):
@@ -971,18 +1475,19 @@ def draw_ai_player_old_information(surface, current_state, q_values, action, act
     :param q_values: Q-Value of every action (can be None)
     :param action: Last action taken
     :param actions_taken: Total number of actions taken
+    :return: Rect containing the area of the screen where the information has been drawn
     """
 
     # Create a rectangle for the additional HUD
-    pygame.draw.rect(surface, background_color, (screen_width, 0, screen_width_extra, screen_height), 0)
+    surface.fill(background_color, (screen_width, 0, screen_width_extra, screen_height))
     pygame.draw.rect(surface, playground_border_color, (screen_width, 0, screen_width_extra, screen_height), 5)
 
     # Identify where to place the additional AI HUD
     hud_begin_x = screen_width + 25
 
     # Create all necessary fonts
-    small_font = pygame.font.Font(font_path, 10)
-    big_font = pygame.font.Font(font_path, 20)
+    small_font = get_font(10)
+    big_font = get_font(20)
 
     # STATE
 
@@ -990,7 +1495,7 @@ def draw_ai_player_old_information(surface, current_state, q_values, action, act
     state_y = 15
 
     # Write the state title and print it
-    state_text = big_font.render('PASSED STATE:', 1, (0, 0, 0))
+    state_text = render_text('PASSED STATE:', 20)
     surface.blit(state_text, (hud_begin_x + ((screen_width + screen_width_extra) - hud_begin_x - 25) // 2 - state_text.get_width() / 2,
                               state_y + 25 - state_text.get_height() / 2))
 
@@ -1003,16 +1508,14 @@ def draw_ai_player_old_information(surface, current_state, q_values, action, act
         qvalues_y = 380
 
         # Draw a black rectangle for all Q values
-        pygame.draw.rect(surface,
-                         playground_border_color,
-                         (screen_width,
-                          qvalues_y,
-                          screen_width_extra,
-                          300),
-                         0)
+        surface.fill(playground_border_color,
+                     (screen_width,
+                      qvalues_y,
+                      screen_width_extra,
+                      300))
 
         # Draw the title
-        qvalues_text = big_font.render('Q-VALUES', 1, (0, 0, 0))
+        qvalues_text = render_text('Q-VALUES', 20)
         surface.blit(qvalues_text, (hud_begin_x + ((screen_width + screen_width_extra) - hud_begin_x - 25) // 2 - qvalues_text.get_width() / 2, qvalues_y + 25 - qvalues_text.get_height() / 2))
 
         # Find the action with the biggest Q-Value
@@ -1023,16 +1526,14 @@ def draw_ai_player_old_information(surface, current_state, q_values, action, act
         # If the text has the highest Q value, a rectangle will be drawn behind
 
         # Draw a rectangle for the best action
-        pygame.draw.rect(surface,
-                         background_color,
-                         (screen_width,
-                          qvalues_y + 50 + best_action * 60,
-                          screen_width_extra,
-                          60),
-                         0)
+        surface.fill(background_color,
+                     (screen_width,
+                      qvalues_y + 50 + best_action * 60,
+                      screen_width_extra,
+                      60))
 
         # RIGHT
-        right_text = big_font.render('RIGHT:', 1, (0, 0, 0))
+        right_text = render_text('RIGHT:', 20)
         surface.blit(right_text, (hud_begin_x, qvalues_y + 50))
 
         # Right content
@@ -1040,7 +1541,7 @@ def draw_ai_player_old_information(surface, current_state, q_values, action, act
         surface.blit(right_content_text, (hud_begin_x + ((screen_width + screen_width_extra) - hud_begin_x - 25) // 2 - right_content_text.get_width() / 2, qvalues_y + 80))
 
         # LEFT
-        left_text = big_font.render('LEFT:', 1, (0, 0, 0))
+        left_text = render_text('LEFT:', 20)
         surface.blit(left_text, (hud_begin_x, qvalues_y + 110))
 
         # Left content
@@ -1048,7 +1549,7 @@ def draw_ai_player_old_information(surface, current_state, q_values, action, act
         surface.blit(left_content_text, (hud_begin_x + ((screen_width + screen_width_extra) - hud_begin_x - 25) // 2 - left_content_text.get_width() / 2, qvalues_y + 140))
 
         # ROTATE
-        rotate_text = big_font.render('ROTATE:', 1, (0, 0, 0))
+        rotate_text = render_text('ROTATE:', 20)
         surface.blit(rotate_text, (hud_begin_x, qvalues_y + 170))
 
         # Rotate content
@@ -1056,7 +1557,7 @@ def draw_ai_player_old_information(surface, current_state, q_values, action, act
         surface.blit(rotate_content_text, (hud_begin_x + ((screen_width + screen_width_extra) - hud_begin_x - 25) // 2 - rotate_content_text.get_width() / 2, qvalues_y + 200))
 
         # HARD DROP
-        harddrop_text = big_font.render('HARD DROP:', 1, (0, 0, 0))
+        harddrop_text = render_text('HARD DROP:', 20)
         surface.blit(harddrop_text, (hud_begin_x, qvalues_y + 230))
 
         # Rotate content
@@ -1065,7 +1566,7 @@ def draw_ai_player_old_information(surface, current_state, q_values, action, act
 
     # LAST ACTION
     action_y = 700
-    action_text = small_font.render('ACTION TAKEN: ' + action, 1, (0, 0, 0))
+    action_text = render_text('ACTION TAKEN: ' + action, 10)
     surface.blit(action_text, (hud_begin_x, action_y))
 
     # TOTAL ACTIONS TAKEN
@@ -1073,6 +1574,9 @@ def draw_ai_player_old_information(surface, current_state, q_values, action, act
     total_actions_text = small_font.render('TOTAL ACTIONS TAKEN: ' + str(actions_taken), 1, (0, 0, 0))
     surface.blit(total_actions_text, (hud_begin_x, total_actions_y))
 
+    # Return the area of the screen used by the additional HUD
+    return pygame.Rect(screen_width, 0, screen_width_extra, screen_height)
+
 
 def draw_ai_learn_old_information(surface, current_state, next_state, action, reward, current_epoch, actions_performed,
                                   current_epsilon, best_epoch, best_score, best_lines, best_actions_performed):
@@ -1091,18 +1595,19 @@ def draw_ai_learn_old_information(surface, current_state, next_state, action, re
     :param best_score: Score from the best epoch
     :param best_lines: Lines cleared from the best epoch
     :param best_actions_performed: Total number of actions performed in the best epoch
+    :return: Rect containing the area of the screen where the information has been drawn
     """
 
     # Create a rectangle for the additional HUD
-    pygame.draw.rect(surface, background_color, (screen_width, 0, screen_width_extra, screen_height), 0)
+    surface.fill(background_color, (screen_width, 0, screen_width_extra, screen_height))
     pygame.draw.rect(surface, playground_border_color, (screen_width, 0, screen_width_extra, screen_height), 5)
 
     # Identify where to place the additional AI HUD
     hud_begin_x = screen_width + 25
 
     # Create necessary fonts
-    small_font = pygame.font.Font(font_path, 15)
-    tiny_font = pygame.font.Font(font_path, 10)
+    small_font = get_font(15)
+    tiny_font = get_font(10)
 
     # CURRENT EPOCH TITLE
     epoch_title_y = 15
@@ -1116,10 +1621,10 @@ def draw_ai_learn_old_information(surface, current_state, next_state, action, re
     state_x = hud_begin_x + 15
     state_y = 50
     # Write the state titles and print them
-    current_state_text = small_font.render('CURRENT', 1, (0, 0, 0))
+    current_state_text = render_text('CURRENT', 15)
     surface.blit(current_state_text, (state_x, state_y + 25 - current_state_text.get_height() / 2))
 
-    new_state_text = small_font.render('NEXT', 1, (0, 0, 0))
+    new_state_text = render_text('NEXT', 15)
     surface.blit(new_state_text, (state_x + 150, state_y + 25 - current_state_text.get_height() / 2))
 
     # Draw the states themselves
@@ -1128,7 +1633,7 @@ def draw_ai_learn_old_information(surface, current_state, next_state, action, re
 
     # ACTION, REWARD AND TOTAL ACTIONS TAKEN
     action_y = 350
-    action_text = tiny_font.render('ACTION TAKEN: ' + action, 1, (0, 0, 0))
+    action_text = render_text('ACTION TAKEN: ' + action, 10)
     surface.blit(action_text, (hud_begin_x, action_y))
 
     reward_y = 380
@@ -1164,6 +1669,9 @@ def draw_ai_learn_old_information(surface, current_state, next_state, action, re
     best_epoch_actions_text = tiny_font.render('ACTIONS TAKEN: ' + str(best_actions_performed), 1, (0, 0, 0))
     surface.blit(best_epoch_actions_text, (hud_begin_x, best_epoch_actions_y))
 
+    # Return the area of the screen used by the additional HUD
+    return pygame.Rect(screen_width, 0, screen_width_extra, screen_height)
+
 
 def draw_ai_player_new_information(surface, target_state, q_value, last_step, actions_taken, steps_taken):
     """
@@ -1176,22 +1684,22 @@ def draw_ai_player_new_information(surface, target_state, q_value, last_step, ac
     :param last_step: Last step taken by the agent
     :param actions_taken: Total number of actions taken
     :param steps_taken: Total number of steps taken
+    :return: Rect containing the area of the screen where the information has been drawn
     """
 
     # Create a rectangle for the additional HUD
-    pygame.draw.rect(surface, background_color, (screen_width, 0, screen_width_extra, screen_height), 0)
+    surface.fill(background_color, (screen_width, 0, screen_width_extra, screen_height))
     pygame.draw.rect(surface, playground_border_color, (screen_width, 0, screen_width_extra, screen_height), 5)
 
     # Identify where to place the additional AI HUD
     hud_begin_x = screen_width + 25
 
     # Create all necessary fonts
-    small_font = pygame.font.Font(font_path, 10)
-    big_font = pygame.font.Font(font_path, 15)
+    small_font = get_font(10)
 
     # AGENT BEING USED
     agent_y = 15
-    agent_text = small_font.render('AGENT: ' + agent.__class__.__name__, 1, (0, 0, 0))
+    agent_text = render_text('AGENT: ' + agent.__class__.__name__, 10)
     surface.blit(agent_text, (hud_begin_x, agent_y))
 
     # TARGET ACTION
@@ -1200,7 +1708,7 @@ def draw_ai_player_new_information(surface, target_state, q_value, last_step, ac
     target_y = 40
 
     # Write the state title and print it
-    target_text = big_font.render('GOAL STATE:', 1, (0, 0, 0))
+    target_text = render_text('GOAL STATE:', 15)
     surface.blit(target_text, (hud_begin_x + ((screen_width + screen_width_extra) - hud_begin_x - 25) // 2 - target_text.get_width() / 2,
                                target_y + 25 - target_text.get_height() / 2))
 
@@ -1214,7 +1722,7 @@ def draw_ai_player_new_information(surface, target_state, q_value, last_step, ac
 
     # LAST STEP
     step_y = 550
-    step_text = small_font.render('LAST STEP: ' + last_step, 1, (0, 0, 0))
+    step_text = render_text('LAST STEP: ' + last_step, 10)
     surface.blit(step_text, (hud_begin_x, step_y))
 
     # TOTAL ACTIONS AND STEPS TAKEN
@@ -1226,6 +1734,9 @@ def draw_ai_player_new_information(surface, target_state, q_value, last_step, ac
     total_steps_text = small_font.render('TOTAL STEPS TAKEN: ' + str(steps_taken), 1, (0, 0, 0))
     surface.blit(total_steps_text, (hud_begin_x, total_steps_y))
 
+    # Return the area of the screen used by the additional HUD
+    return pygame.Rect(screen_width, 0, screen_width_extra, screen_height)
+
 
 def draw_ai_learn_new_information(surface, current_epoch, original_state, goal_state, q_value, actions_taken, steps_taken,
                                   current_epsilon, best_epoch, best_lines, best_score, best_actions, best_steps):
@@ -1245,22 +1756,23 @@ def draw_ai_learn_new_information(surface, current_epoch, original_state, goal_s
     :param best_lines: Score achieved during the best epoch
     :param best_actions: Actions performed during the best epoch
     :param best_steps: Steps performed during the best epoch
+    :return: Rect containing the area of the screen where the information has been drawn
     """
 
     # Create a rectangle for the additional HUD
-    pygame.draw.rect(surface, background_color, (screen_width, 0, screen_width_extra, screen_height), 0)
+    surface.fill(background_color, (screen_width, 0, screen_width_extra, screen_height))
     pygame.draw.rect(surface, playground_border_color, (screen_width, 0, screen_width_extra, screen_height), 5)
 
     # Identify where to place the additional AI HUD
     hud_begin_x = screen_width + 25
 
     # Create necessary fonts
-    small_font = pygame.font.Font(font_path, 15)
-    tiny_font = pygame.font.Font(font_path, 10)
+    small_font = get_font(15)
+    tiny_font = get_font(10)
 
     # AGENT BEING USED
     agent_y = 15
-    agent_text = tiny_font.render('AGENT: ' + agent.__class__.__name__, 1, (0, 0, 0))
+    agent_text = render_text('AGENT: ' + agent.__class__.__name__, 10)
     surface.blit(agent_text, (hud_begin_x, agent_y))
 
     # CURRENT EPOCH TITLE
@@ -1275,10 +1787,10 @@ def draw_ai_learn_new_information(surface, current_epoch, original_state, goal_s
     state_x = hud_begin_x + 15
     state_y = 70
     # Write the state titles and print them
-    original_state_text = small_font.render('ORIGINAL', 1, (0, 0, 0))
+    original_state_text = render_text('ORIGINAL', 15)
     surface.blit(original_state_text, (state_x, state_y + 25 - original_state_text.get_height() / 2))
 
-    goal_state_text = small_font.render('GOAL', 1, (0, 0, 0))
+    goal_state_text = render_text('GOAL', 15)
     surface.blit(goal_state_text, (state_x + 150, state_y + 25 - goal_state_text.get_height() / 2))
 
     # Draw the states themselves
@@ -1328,10 +1840,33 @@ def draw_ai_learn_new_information(surface, current_epoch, original_state, goal_s
     best_epoch_steps_text = tiny_font.render('STEPS TAKEN: ' + str(best_steps), 1, (0, 0, 0))
     surface.blit(best_epoch_steps_text, (hud_begin_x, best_epoch_steps_y))
 
+    # Return the area of the screen used by the additional HUD
+    return pygame.Rect(screen_width, 0, screen_width_extra, screen_height)
+
 
 # GAMEPLAY #
 
-def generate_state(locked_positions, current_piece):
+def generate_locked_state(locked_positions):
+    """
+    Computes the part of the state that corresponds to the locked positions (without the current piece).
+
+    :param locked_positions: The current grid of the game
+    :return: 20x10 numpy matrix, where locked positions are 1 and the rest of positions are 0
+    """
+
+    # Generate the initial state (all 0s)
+    state = np.zeros((20, 10), dtype=int)
+
+    # For all positions in the locked grid, change the value to 1 (all of them at once)
+    # (Rows above the playzone are negative, and are indexed from the end of the state like Python lists would)
+    keys = np.fromiter(locked_positions.keys(), dtype=int, count=len(locked_positions))
+    rows, columns = np.divmod(keys, 10)
+    state[rows, columns] = 1
+
+    return state
+
+
+def generate_state(locked_positions, current_piece, locked_state=None):
     """
     Computes the current state from the current game grid.
 
@@ -1345,27 +1880,27 @@ def generate_state(locked_positions, current_piece):
 
     :param locked_positions: The current grid of the game
     :param current_piece: The current piece being played
+    :param locked_state: (OPTIONAL) State of the locked positions (as generated by generate_locked_state), used when
+    several states are generated for the same locked positions. If not specified, it is generated.
     :return: The processed state
     """
 
-    # Generate the initial grid (all 0s)
-    grid = [[0 for _ in range(10)] for _ in range(20)]
-
-    # For all positions in the locked grid, change the value to 1
-    for (j, i) in locked_positions.keys():
-        grid[i][j] = 1
+    # Obtain the state of the locked positions (a copy is used if it has already been generated)
+    if locked_state is None:
+        state = generate_locked_state(locked_positions)
+    else:
+        state = locked_state.copy()
 
     # Obtain the positions of the current piece and change them to 1
-    piece_positions = generate_shape_positions(current_piece)
-    for (x, y) in piece_positions:
+    for (x, y) in generate_shape_positions(current_piece):
         # Ignore negative positions (they're still out of bounds)
         if x >= 0 and y >= 0:
-            grid[y][x] = 1
+            state[y, x] = 1
 
-    return np.array(grid)
+    return state
 
 
-def generate_possible_actions(locked_positions, current_piece):
+def generate_possible_actions(locked_positions, current_piece, row_masks=None):
     """
     From the current locked positions and the current piece in place, generate all possible actions
     (all possible column and rotations for the current piece in play)
@@ -1378,6 +1913,8 @@ def generate_possible_actions(locked_positions, current_piece):
 
     :param locked_positions: The current grid of the game
     :param current_piece: The current piece being played
+    :param row_masks: Bitboard of the locked positions (as generated by create_row_masks). If not specified, it is
+    generated from the locked positions.
     :return: A list A of possible actions
     """
 
@@ -1389,8 +1926,11 @@ def generate_possible_actions(locked_positions, current_piece):
     original_y = current_piece.y
     original_rot = current_piece.rotation
 
-    # Generate the current grid
-    grid = create_grid(locked_positions)
+    # Generate the current bitboard (unless it is already known) and the state of the locked positions
+    # (shared by all the checks done and all the states generated while searching for the actions)
+    if row_masks is None:
+        row_masks = create_row_masks(locked_positions)
+    locked_state = generate_locked_state(locked_positions)
 
     # Obtain all possible rotations for the current piece
     rotation_amount = len(current_piece.shape)
@@ -1409,14 +1949,20 @@ def generate_possible_actions(locked_positions, current_piece):
             legal_move = True
 
             # The piece will have to emulate being moved to the actual position
+            # (As soon as an illegal position is reached, the rest of the path does not need to be checked)
             # Rotations - Rotate the piece (lowering its depth with every rotation)
             for _ in range(rot):
-                current_piece.rotation += 1
+                current_piece.rotate()
                 current_piece.y += 1
 
                 # If an illegal position is reached at any point, mark the action as illegal
-                if not valid_space(current_piece, grid):
+                if not valid_space(current_piece, row_masks):
                     legal_move = False
+                    break
+
+            # If the position was marked as illegal, this action is not possible: remove it
+            if not legal_move:
+                continue
 
             # Movements - Move the piece to the target position (lowering its depth with every movement)
             x_difference = current_piece.x - x
@@ -1428,32 +1974,28 @@ def generate_possible_actions(locked_positions, current_piece):
                     current_piece.y += 1
 
                     # If an illegal position is reached at any point, mark the action as illegal
-                    if not valid_space(current_piece, grid):
+                    if not valid_space(current_piece, row_masks):
                         legal_move = False
+                        break
             elif x_difference > 0:
                 for _ in range(x_difference):
                     current_piece.x -= 1
                     current_piece.y += 1
 
                     # If an illegal position is reached at any point, mark the action as illegal
-                    if not valid_space(current_piece, grid):
+                    if not valid_space(current_piece, row_masks):
                         legal_move = False
+                        break
 
             # If the position was marked as illegal, this action is not possible: remove it
             if not legal_move:
                 continue
 
-            # While the position is valid, move down
-            # We move down until the piece is placed down
-            while valid_space(current_piece, grid):
-                current_piece.y += 1
-
-            # Once the position is not valid, move the piece upwards
-            # (return to the last valid position)
-            current_piece.y -= 1
+            # Move the piece down until it is placed down (the lowest valid position is computed directly)
+            current_piece.y += drop_distance(current_piece, row_masks)
 
-            # Generate the current state and store it into the dictionary
-            state = generate_state(locked_positions, current_piece)
+            # Generate the current state (reusing the state of the locked positions) and store it into the dictionary
+            state = generate_state(locked_positions, current_piece, locked_state)
             actions.append((x, rot, state))
 
     # Return the current piece to the original position
@@ -1623,7 +2165,7 @@ def compute_bumpiness(state):
     return bumpiness
 
 
-def compute_heuristic_state_score(locked_pieces, current_piece, piece_locked):
+def compute_heuristic_state_score(locked_pieces, current_piece, piece_locked, row_masks=None):
     """
     From a game state, compute the heuristic score for the state
 
@@ -1638,6 +2180,8 @@ def compute_heuristic_state_score(locked_pieces, current_piece, piece_locked):
     :param locked_pieces: Dictionary containing the currently locked pieces in the grid
     :param current_piece: Current piece in play
     :param piece_locked: TRUE if the current piece has been locked, FALSE otherwise
+    :param row_masks: Bitboard of the locked pieces (as generated by create_row_masks). If not specified and it is
+    needed, it is generated from the locked pieces.
 
     :return: Score of the state
     """
@@ -1647,12 +2191,11 @@ def compute_heuristic_state_score(locked_pieces, current_piece, piece_locked):
 
     # Try to drop down the current piece if it is not already locked
     if not piece_locked:
-        # Compute the grid
-        grid = create_grid(locked_pieces)
+        # Compute the bitboard (unless it is already known)
+        if row_masks is None:
+            row_masks = create_row_masks(locked_pieces)
         # Lower the piece until it touches the bottom
-        while valid_space(current_piece, grid):
-            current_piece.y += 1
-        current_piece.y -= 1
+        current_piece.y += drop_distance(current_piece, row_masks)
 
     # Generate the state and return the piece to the correct location
     state = generate_state(locked_pieces, current_piece)
@@ -1853,16 +2396,26 @@ def initialize_game():
 
     This has been taken into a separate method since it is shared by all three loops
 
-    :returns tuple(locked_positions, current_speed, score, lines, level, change_piece, run, randomizer_shapes,
-            current_piece, next_piece, clock, fall_time)
+    :returns tuple(locked_positions, grid, row_masks, shape_pos, current_speed, score, lines, level, change_piece, run,
+            randomizer_shapes, current_piece, next_piece, clock, fall_time)
             (meaning of each value explained in the code)
     """
 
     # Variables used by the main loop #
 
     # Grid with all the locked positions
+    # Positions (x, y) are packed into a single integer key (y * 10 + x), which is faster to hash than a tuple
+    # (Both values can be obtained back using divmod(key, 10), even for the negative rows above the playzone)
     locked_positions = {}
 
+    # Grid (playzone) and its bitboard. Both are kept during the whole game and updated incrementally
+    # (the grid when the piece moves, the bitboard when a piece is locked) instead of being created every tick
+    grid = create_grid(locked_positions)
+    row_masks = create_row_masks(locked_positions)
+
+    # Positions currently occupied by the piece in play inside the grid (no piece has been placed yet)
+    shape_pos = []
+
     # Speed at which the pieces fall (to be updated during the loop)
     # Speed can be increased up to 9 times at most
     current_speed = initial_speed
@@ -1892,11 +2445,11 @@ def initialize_game():
     play_song()
 
     # Return all initialized variables
-    return (locked_positions, current_speed, score, lines, level, change_piece, run, randomizer_shapes,
-            current_piece, next_piece, clock, fall_time)
+    return (locked_positions, grid, row_masks, shape_pos, current_speed, score, lines, level, change_piece, run,
+            randomizer_shapes, current_piece, next_piece, clock, fall_time)
 
 
-def process_inputs(inputs, current_piece, grid):
+def process_inputs(inputs, current_piece, row_masks):
     """
     Given a list of inputs, processes them and applies them to the board
 
@@ -1905,8 +2458,8 @@ def process_inputs(inputs, current_piece, grid):
 
     :param inputs: List containing all inputs to be processed
     :param current_piece: Piece currently in play
-    :param grid: Current grid of the game
-    :return: Updated current_piece, grid and change_piece
+    :param row_masks: Bitboard of the current grid of the game (as generated by create_row_masks)
+    :return: Updated current_piece and change_piece
     """
 
     # Sets the change_piece to False (change_piece computes if the piece should be locked or not,
@@ -1919,59 +2472,73 @@ def process_inputs(inputs, current_piece, grid):
         # Left (move left and play the appropriate sound)
         if action == "left":
             current_piece.x -= 1
-            if not valid_space(current_piece, grid):
+            if not valid_space(current_piece, row_masks):
                 current_piece.x += 1
             play_sound("action")
 
         # Right (move right and play the appropriate sound)
         if action == "right":
             current_piece.x += 1
-            if not valid_space(current_piece, grid):
+            if not valid_space(current_piece, row_masks):
                 current_piece.x -= 1
             play_sound("action")
 
         # Soft drop (moves the piece down a position)
         if action == "soft_drop":
             current_piece.y += 1
-            if not valid_space(current_piece, grid):
+            if not valid_space(current_piece, row_masks):
                 current_piece.y -= 1
 
         # Hard / instant drop (instantly moves the piece to the lowest position it can move)
         if action == "hard_drop":
-            # Try to move the piece down until an illegal position is reached, and then move upwards to reach
-            # the final valid position
-            while valid_space(current_piece, grid):
-                current_piece.y += 1
-            current_piece.y -= 1
+            # Move the piece directly to the lowest valid position it can reach
+            current_piece.y += drop_distance(current_piece, row_masks)
 
             # After a hard drop, piece will be guaranteed to be locked
             change_piece = True
 
         # Rotation (rotates the piece into the next rotation)
         if action == "rotate":
-            current_piece.rotation += 1
-            if not valid_space(current_piece, grid):
-                current_piece.rotation -= 1
+            current_piece.rotate()
+            if not valid_space(current_piece, row_masks):
+                current_piece.rotate(-1)
             play_sound("action")
 
     # Returns all values
-    return current_piece, grid, change_piece
+    return current_piece, change_piece
 
 
-def place_piece(current_piece, grid):
+def place_piece(current_piece, grid, previous_pos, locked_positions):
     """
     Inserts the current piece into the grid
 
+    The grid is updated incrementally: the positions occupied by the piece in the previous tick are restored first
+    (to the color of the locked block below them, or to empty), and then the piece is drawn again
+
     :param current_piece: Piece currently in play
     :param grid: Current state of the grid
+    :param previous_pos: Positions occupied by the piece in the previous tick (as returned by this method)
+    :param locked_positions: Dictionary of locked positions, where key = y * 10 + x and value = color index of the position
     :return: Updated grid and shape_pos (current_piece converted into grid positions)
     """
 
+    # Obtain the positions of the piece. They are memoized in the piece, so if it has not moved or rotated since the
+    # previous tick the same list is returned: the piece is already in place, and the grid does not need to be updated
     shape_pos = generate_shape_positions(current_piece)
-    for i in range(len(shape_pos)):
-        x, y = shape_pos[i]
+    if shape_pos is previous_pos:
+        return grid, shape_pos
+
+    # Remove the piece from its previous position
+    for x, y in previous_pos:
+        if y > -1:
+            grid[y, x] = locked_positions.get(y * 10 + x, 0)
+
+    # Draw the piece in its new position (the grid is a contiguous matrix of bytes, so each block is a single store)
+    # With only four blocks per piece, direct stores are cheaper than building index arrays for fancy indexing
+    color_index = current_piece.color_index
+    for x, y in shape_pos:
         if y > -1:
-            grid[y][x] = current_piece.color
+            grid[y, x] = color_index
 
     return grid, shape_pos
 
@@ -1990,22 +2557,34 @@ def main_human_player(win):
     """
 
     # Initialize all necessary variables
-    (locked_positions, current_speed, score, lines, level, change_piece, run, randomizer_shapes, current_piece,
-     next_piece, clock, fall_time) = initialize_game()
+    # (The clock is not needed: the falls of the piece are marked by a timer event)
+    (locked_positions, grid, row_masks, shape_pos, current_speed, score, lines, level, change_piece, run,
+     randomizer_shapes, current_piece, next_piece, _, _) = initialize_game()
+
+    # The game cannot be lost until a piece has been locked
+    game_over = False
+
+    # Start the timer that makes the piece fall
+    pygame.time.set_timer(piece_fall_event, current_speed)
+
+    # Draw the initial state of the game (after that, the screen is only drawn when something happens)
+    grid, shape_pos = place_piece(current_piece, grid, shape_pos, locked_positions)
+    pygame.display.update(draw_manager(win, grid, current_piece, next_piece, score, level, lines))
 
     # While the game is not over (main logic loop)
     while run:
 
-        # Create the grid and update all the clocks, marking a new tick
-        grid = create_grid(locked_positions)
-        fall_time += clock.get_rawtime()
-        clock.tick()
-
         # Create a list to contain all processed inputs
         actions = []
 
-        # Process all the player inputs
-        for event in pygame.event.get():
+        # Whether the piece has to fall this tick
+        piece_falls = False
+
+        # Whether the window has been uncovered this tick (and has to be drawn again)
+        window_exposed = False
+
+        # Sleep until an event happens, and then process it along with all the other pending events
+        for event in [pygame.event.wait()] + pygame.event.get():
 
             # Window has been closed
             if event.type == pygame.QUIT:
@@ -2013,6 +2592,15 @@ def main_human_player(win):
                 pygame.quit()
                 sys.exit()
 
+            # Window has been uncovered: the whole screen is drawn again this tick
+            if event.type == pygame.VIDEOEXPOSE:
+                invalidate_screen()
+                window_exposed = True
+
+            # The fall timer has expired
+            if event.type == piece_fall_event:
+                piece_falls = True
+
             # Key has been pressed
             if event.type == pygame.KEYDOWN:
 
@@ -2041,81 +2629,100 @@ def main_human_player(win):
                 if event.key == pygame.K_r:
                     actions.append("rotate")
 
+        # If nothing has changed (no actions, no fall and no exposure), there is nothing to update or draw
+        if not actions and not piece_falls and not window_exposed:
+            continue
+
         # Execute all processed inputs
-        current_piece, grid, change_piece = process_inputs(actions, current_piece, grid)
+        current_piece, change_piece = process_inputs(actions, current_piece, row_masks)
 
-        # Clock calculations (make the piece fall)
-        if fall_time > current_speed:
-            fall_time = 0
+        # Make the piece fall
+        if piece_falls:
             current_piece.y += 1
             # If, after lowering the piece, it reaches an invalid position, it has touched another piece: lock it
-            if not valid_space(current_piece, grid) and current_piece.y > 0:
+            if not valid_space(current_piece, row_masks) and current_piece.y > 0:
                 current_piece.y -= 1
                 change_piece = True
 
         # Place the current piece into the grid
-        grid, shape_pos = place_piece(current_piece, grid)
+        grid, shape_pos = place_piece(current_piece, grid, shape_pos, locked_positions)
 
         # If the piece has been locked in place
         if change_piece:
 
-            # Add the current piece to locked positions (conserving the biggest y value)
-            # The biggest Y value is stored to compute the score later
-            shape_y = -1
-            for pos in shape_pos:
-                if pos[1] > shape_y:
-                    shape_y = pos[1]
-                p = (pos[0], pos[1])
-                locked_positions[p] = current_piece.color
+            # Store the biggest Y value of the current piece (the lowest row it reaches) to compute the score later
+            # It is known directly from the precomputed extent of the rotation (and it is never considered below -1)
+            shape_y = max(-1, current_piece.y + current_piece.masks[current_piece.rotation][4])
+
+            # Add the current piece to locked positions
+            color_index = current_piece.color_index
+            for x, y in shape_pos:
+                locked_positions[y * 10 + x] = color_index
 
             # Get the next piece
             current_piece = next_piece
             next_piece, randomizer_shapes = get_shape(randomizer_shapes)
 
-            # Update lines cleared
+            # Update lines cleared (the amount of cleared lines is stored, since it is used several times)
             lines_cleared = clear_rows(grid, locked_positions)
-            lines += len(lines_cleared)
+            amount_cleared = len(lines_cleared)
+
+            # Check if the locked piece has reached the top of the screen
+            # (This is the only moment when the game can be lost)
+            game_over = check_defeat(shape_pos, lines_cleared)
+
+            # Update the bitboard with the new locked piece and the cleared lines
+            # (The locked piece stays in the grid, so it must not be removed from it the next tick)
+            update_row_masks(row_masks, shape_pos, lines_cleared, locked_positions)
+            shape_pos = []
+            lines += amount_cleared
 
             # Compute the new score
-            score_increase = compute_score(len(lines_cleared), shape_y, level)
+            score_increase = compute_score(amount_cleared, shape_y, level)
 
             # Update the level and speed
             level = lines // 10
-            current_speed = initial_speed - speed_modifier * level
-            # Ensure that the speed doesn't go below a limit
-            if current_speed < minimum_speed:
-                current_speed = minimum_speed
+            # The speed is clamped so it does not go below a limit
+            current_speed = max(minimum_speed, initial_speed - speed_modifier * level)
 
             # Play the piece lock sound
             play_sound("fall")
 
             # Check if an animation needs to be played (lines have been cleared)
-            if len(lines_cleared) > 0:
+            if amount_cleared > 0:
 
                 # Play the appropriate sound. Sound is played before the effect is drawn to ensure it's not delayed
                 play_sound("line")
 
                 # Draw the screen first (to ensure the piece is displayed on its proper place) and then draw the effect
-                draw_manager(win, grid, current_piece, next_piece, score, level, lines - len(lines_cleared))
-                draw_clear_row(win, lines_cleared)
+                dirty_rects = draw_manager(win, grid, current_piece, next_piece, score, level, lines - amount_cleared)
+                draw_clear_row(win, lines_cleared, dirty_rects)
+
+                # Remove the cleared rows from the grid (once the effect has been drawn)
+                remove_grid_rows(grid, lines_cleared, locked_positions)
 
             # Update the score
             score += score_increase
 
-            # Tick the clock again, to ensure that no time is lost due to the processing
-            clock.tick()
+            # Restart the fall timer with the new speed, discarding the falls that happened during the processing
+            # (to ensure that no time is lost due to the processing)
+            pygame.time.set_timer(piece_fall_event, current_speed)
+            pygame.event.clear(piece_fall_event)
 
-        # Draw everything and update the screen
-        draw_manager(win, grid, current_piece, next_piece, score, level, lines)
-        pygame.display.flip()
+        # Draw everything and update the areas of the screen that have changed
+        dirty_rects = draw_manager(win, grid, current_piece, next_piece, score, level, lines)
+        pygame.display.update(dirty_rects)
 
         # Check if the game has ended
-        if check_defeat(locked_positions):
+        if game_over:
             stop_sounds()
             play_sound("lost")
             draw_game_over_effect(win)
             run = False
 
+    # Stop the fall timer once the game is over
+    pygame.time.set_timer(piece_fall_event, 0)
+
 # ORIGINAL APPROACH ("OLD") #
 # This approach considers an action as a player input
 
@@ -2131,8 +2738,11 @@ def main_ai_player_old(win):
     """
 
     # Initialize all necessary variables
-    (locked_positions, _, score, lines, level, change_piece, run, randomizer_shapes, current_piece,
-     next_piece, clock, fall_time) = initialize_game()
+    (locked_positions, grid, row_masks, shape_pos, _, score, lines, level, change_piece, run,
+     randomizer_shapes, current_piece, next_piece, clock, fall_time) = initialize_game()
+
+    # The game cannot be lost until a piece has been locked
+    game_over = False
 
     # Current speed will be fixed to the specified value (and not updated)
     current_speed = game_speed_ai
@@ -2148,15 +2758,13 @@ def main_ai_player_old(win):
     # While the game is not over (main logic loop)
     while run:
 
-        # Create the grid and update all the clocks, marking a new tick
-        grid = create_grid(locked_positions)
-
         # Check if fast mode is active
         # NOT ACTIVE: The real-time clock is used
         if not fast_training:
-            fall_time += clock.get_rawtime()
-            poll_time += clock.get_rawtime()
-            clock.tick()
+            # (The loop is capped at max_fps, so the elapsed time includes the time spent waiting by the clock)
+            fall_time += clock.get_time()
+            poll_time += clock.get_time()
+            clock.tick(max_fps)
         # ACTIVE: automatically increase the counters by the polling speed
         else:
             fall_time += polling_speed
@@ -2165,22 +2773,28 @@ def main_ai_player_old(win):
         # Unless specified otherwise, the piece is not going to be locked
         change_piece = False
 
-        # Check if the player has exited the game or has pressed the ESC key
-        for event in pygame.event.get():
+        # (In fast mode there is no window, so there are no events to check)
+        if not fast_training:
+            # Check if the player has exited the game or has pressed the ESC key
+            for event in pygame.event.get():
 
-            # Window has been closed
-            if event.type == pygame.QUIT:
-                pygame.display.quit()
-                pygame.quit()
-                sys.exit()
+                # Window has been closed
+                if event.type == pygame.QUIT:
+                    pygame.display.quit()
+                    pygame.quit()
+                    sys.exit()
 
-            # Key has been pressed
-            if event.type == pygame.KEYDOWN:
+                # Window has been uncovered: the whole screen is drawn again in the next frame
+                if event.type == pygame.VIDEOEXPOSE:
+                    invalidate_screen()
 
-                # ESC key (exit to main menu)
-                if event.key == pygame.K_ESCAPE:
-                    run = False
-                    stop_sounds()
+                # Key has been pressed
+                if event.type == pygame.KEYDOWN:
+
+                    # ESC key (exit to main menu)
+                    if event.key == pygame.K_ESCAPE:
+                        run = False
+                        stop_sounds()
 
         # Prepare the current state for the AI
         current_state = generate_state(locked_positions, current_piece)
@@ -2193,39 +2807,50 @@ def main_ai_player_old(win):
         if poll_time > polling_speed:
             poll_time = 0
             action, q_values = agent.act(current_state)
-            current_piece, grid, change_piece = process_inputs([action], current_piece, grid)
+            current_piece, change_piece = process_inputs([action], current_piece, row_masks)
 
         # 2 - If needed, move the piece downwards
         if fall_time > current_speed:
             fall_time = 0
             current_piece.y += 1
-            if not valid_space(current_piece, grid) and current_piece.y > 0:
+            if not valid_space(current_piece, row_masks) and current_piece.y > 0:
                 current_piece.y -= 1
                 change_piece = True
 
         # Place the current piece into the grid
-        grid, shape_pos = place_piece(current_piece, grid)
+        grid, shape_pos = place_piece(current_piece, grid, shape_pos, locked_positions)
 
         # If the piece has been locked in place
         if change_piece:
-            # Add the current piece to locked positions (conserving the biggest y value)
-            shape_y = -1
-            for pos in shape_pos:
-                if pos[1] > shape_y:
-                    shape_y = pos[1]
-                p = (pos[0], pos[1])
-                locked_positions[p] = current_piece.color
+            # Store the biggest Y value of the current piece (the lowest row it reaches) to compute the score later
+            # It is known directly from the precomputed extent of the rotation (and it is never considered below -1)
+            shape_y = max(-1, current_piece.y + current_piece.masks[current_piece.rotation][4])
+
+            # Add the current piece to locked positions
+            color_index = current_piece.color_index
+            for x, y in shape_pos:
+                locked_positions[y * 10 + x] = color_index
 
             # Get the next piece
             current_piece = next_piece
             next_piece, randomizer_shapes = get_shape(randomizer_shapes)
 
-            # Update lines
+            # Update lines (the amount of cleared lines is stored, since it is used several times)
             lines_cleared = clear_rows(grid, locked_positions)
-            lines += len(lines_cleared)
+            amount_cleared = len(lines_cleared)
+
+            # Check if the locked piece has reached the top of the screen
+            # (This is the only moment when the game can be lost)
+            game_over = check_defeat(shape_pos, lines_cleared)
+
+            # Update the bitboard with the new locked piece and the cleared lines
+            # (The locked piece stays in the grid, so it must not be removed from it the next tick)
+            update_row_masks(row_masks, shape_pos, lines_cleared, locked_positions)
+            shape_pos = []
+            lines += amount_cleared
 
             # Compute the score increase
-            score_increase = compute_score(len(lines_cleared), shape_y, level)
+            score_increase = compute_score(amount_cleared, shape_y, level)
 
             # Update level (speed is not increased in AI mode)
             level = lines // 10
@@ -2234,31 +2859,37 @@ def main_ai_player_old(win):
             play_sound("fall")
 
             # Check if a line animation has to be played
-            if len(lines_cleared) > 0:
+            if amount_cleared > 0:
                 # Play the appropriate sound. Sound is played before the effect is drawn to ensure it's not delayed
                 play_sound("line")
 
                 # Draw the screen first (to ensure the piece is displayed on its proper place) and then draw the effect
                 if not fast_training:
-                    draw_manager(win, grid, current_piece, next_piece, score, level, lines - len(lines_cleared))
-                    draw_ai_player_old_information(win, current_state, q_values, action, agent.actions_performed)
-                    draw_clear_row(win, lines_cleared)
+                    dirty_rects = draw_manager(win, grid, current_piece, next_piece, score, level, lines - amount_cleared)
+                    dirty_rects.append(draw_ai_player_old_information(win, current_state, q_values, action,
+                                                                      agent.actions_performed))
+                    draw_clear_row(win, lines_cleared, dirty_rects)
+
+                # Remove the cleared rows from the grid (once the effect has been drawn)
+                remove_grid_rows(grid, lines_cleared, locked_positions)
 
             # Update the score
             score += score_increase
 
-            # Prepare everything for the next loop
-            clock.tick()
+            # Prepare everything for the next loop (the clock is only used if not in fast mode)
+            if not fast_training:
+                clock.tick()
 
         # Draw everything (original HUD and AI HUD)
         if not fast_training:
-            draw_manager(win, grid, current_piece, next_piece, score, level, lines)
-            draw_ai_player_old_information(win, current_state, q_values, action, agent.actions_performed)
-            # Update the screen
-            pygame.display.flip()
+            dirty_rects = draw_manager(win, grid, current_piece, next_piece, score, level, lines)
+            dirty_rects.append(draw_ai_player_old_information(win, current_state, q_values, action,
+                                                              agent.actions_performed))
+            # Update the areas of the screen that have changed
+            pygame.display.update(dirty_rects)
 
         # Check if the game has ended
-        if check_defeat(locked_positions):
+        if game_over:
             # Only play effects if the agent is not in fast mode
             if not fast_training:
                 stop_sounds()
@@ -2305,8 +2936,11 @@ def main_ai_learn_old(win):
         # GAME START:
 
         # Initialize all necessary variables
-        (locked_positions, _, score, lines, level, change_piece, run, randomizer_shapes, current_piece,
-         next_piece, clock, fall_time) = initialize_game()
+        (locked_positions, grid, row_masks, shape_pos, _, score, lines, level, change_piece, run,
+         randomizer_shapes, current_piece, next_piece, clock, fall_time) = initialize_game()
+
+        # The game cannot be lost until a piece has been locked
+        game_over = False
 
         # Piece fall speed will not change during the game, so it will not be modified
         current_speed = game_speed_ai
@@ -2328,15 +2962,13 @@ def main_ai_learn_old(win):
         # While the game is not over (main logic loop)
         while run:
 
-            # Create the grid
-            grid = create_grid(locked_positions)
-
             # Check if fast mode is active
             # NOT ACTIVE: The real-time clock is used
             if not fast_training:
-                fall_time += clock.get_rawtime()
-                poll_time += clock.get_rawtime()
-                clock.tick()
+                # (The loop is capped at max_fps, so the elapsed time includes the time spent waiting by the clock)
+                fall_time += clock.get_time()
+                poll_time += clock.get_time()
+                clock.tick(max_fps)
             # ACTIVE: automatically increase the counters by the polling speed
             else:
                 fall_time += polling_speed
@@ -2345,22 +2977,29 @@ def main_ai_learn_old(win):
             # The piece is not going to change (unless otherwise specified)
             change_piece = False
 
-            # Check if the player has exited the game
-            # Train mode cannot be exited using ESC (needs to be canceled through the console or closing the window)
-            for event in pygame.event.get():
+            # (In fast mode there is no window, so there are no events to check)
+            if not fast_training:
+                # Check if the player has exited the game
+                # Train mode cannot be exited using ESC (needs to be canceled through the console or closing the window)
+                for event in pygame.event.get():
 
-                # Window has been closed
-                if event.type == pygame.QUIT:
-                    pygame.display.quit()
-                    pygame.quit()
-                    sys.exit()
+                    # Window has been closed
+                    if event.type == pygame.QUIT:
+                        pygame.display.quit()
+                        pygame.quit()
+                        sys.exit()
+
+                    # Window has been uncovered: the whole screen is drawn again in the next frame
+                    if event.type == pygame.VIDEOEXPOSE:
+                        invalidate_screen()
 
             # Prepare the current state for the AI
             current_state = generate_state(locked_positions, current_piece)
 
             # If no previous state heuristic cost is present (new game or a piece was just locked), compute it
             if previous_state_score is None:
-                previous_state_score = compute_heuristic_state_score(locked_positions, current_piece, change_piece)
+                previous_state_score = compute_heuristic_state_score(locked_positions, current_piece, change_piece,
+                                                                     row_masks)
 
             # Clock calculations
             # The order of these calculations is relevant. The movement must be polled first always
@@ -2375,18 +3014,18 @@ def main_ai_learn_old(win):
                 # Get the action and the q-values
                 action, q_values = agent.act(current_state)
                 # Act
-                current_piece, grid, change_piece = process_inputs([action], current_piece, grid)
+                current_piece, change_piece = process_inputs([action], current_piece, row_masks)
 
             # 2 - If needed, move the piece downwards
             if fall_time > current_speed:
                 fall_time = 0
                 current_piece.y += 1
-                if not valid_space(current_piece, grid) and current_piece.y > 0:
+                if not valid_space(current_piece, row_masks) and current_piece.y > 0:
                     current_piece.y -= 1
                     change_piece = True
 
             # Place the current piece into the grid
-            grid, shape_pos = place_piece(current_piece, grid)
+            grid, shape_pos = place_piece(current_piece, grid, shape_pos, locked_positions)
 
             # Variables used later to store the experience #
 
@@ -2404,13 +3043,14 @@ def main_ai_learn_old(win):
 
             # If the piece has been locked in place
             if change_piece:
-                # Add the current piece to locked positions (conserving the biggest y value)
-                shape_y = -1
-                for pos in shape_pos:
-                    if pos[1] > shape_y:
-                        shape_y = pos[1]
-                    p = (pos[0], pos[1])
-                    locked_positions[p] = current_piece.color
+                # Store the biggest Y value of the current piece (the lowest row it reaches) to compute the score later
+                # It is known directly from the precomputed extent of the rotation (and it is never considered below -1)
+                shape_y = max(-1, current_piece.y + current_piece.masks[current_piece.rotation][4])
+
+                # Add the current piece to locked positions
+                color_index = current_piece.color_index
+                for x, y in shape_pos:
+                    locked_positions[y * 10 + x] = color_index
 
                 # Update the lowest Y outside
                 lowest_y = shape_y
@@ -2419,43 +3059,56 @@ def main_ai_learn_old(win):
                 current_piece = next_piece
                 next_piece, randomizer_shapes = get_shape(randomizer_shapes)
 
-                # Update lines
+                # Update lines (the amount of cleared lines is stored, since it is used several times)
                 lines_cleared = clear_rows(grid, locked_positions)
-                lines += len(lines_cleared)
+                amount_cleared = len(lines_cleared)
+
+                # Check if the locked piece has reached the top of the screen
+                # (This is the only moment when the game can be lost)
+                game_over = check_defeat(shape_pos, lines_cleared)
+
+                # Update the bitboard with the new locked piece and the cleared lines
+                # (The locked piece stays in the grid, so it must not be removed from it the next tick)
+                update_row_masks(row_masks, shape_pos, lines_cleared, locked_positions)
+                shape_pos = []
+                lines += amount_cleared
 
                 # Compute the score increase
-                score_increase = compute_score(len(lines_cleared), shape_y, level)
+                score_increase = compute_score(amount_cleared, shape_y, level)
 
                 # Update the level (speed does not increase in AI mode)
                 level = lines // 10
 
                 # Update the lines cleared outside
-                lines_cleared_store = len(lines_cleared)
+                lines_cleared_store = amount_cleared
 
                 # Play the piece lock sound
                 play_sound("fall")
 
                 # Check if a line clear needs to be animated
-                if len(lines_cleared) > 0:
+                if amount_cleared > 0:
                     # Play the appropriate sound. Sound is played before the effect is drawn to ensure it's not delayed
                     play_sound("line")
 
                     # Draw the screen first (to ensure the piece is displayed on its proper place) and then draw the effect
                     if not fast_training:
-                        draw_manager(win, grid, current_piece, next_piece, score, level, lines - len(lines_cleared))
-                        draw_ai_learn_old_information(win,
-                                                      hud_current_state,
-                                                      hud_next_state,
-                                                      hud_action,
-                                                      hud_reward,
-                                                      current_epoch,
-                                                      agent.actions_performed,
-                                                      agent.epsilon,
-                                                      best_epoch,
-                                                      best_score,
-                                                      best_lines,
-                                                      best_actions)
-                        draw_clear_row(win, lines_cleared)
+                        dirty_rects = draw_manager(win, grid, current_piece, next_piece, score, level, lines - amount_cleared)
+                        dirty_rects.append(draw_ai_learn_old_information(win,
+                                                                         hud_current_state,
+                                                                         hud_next_state,
+                                                                         hud_action,
+                                                                         hud_reward,
+                                                                         current_epoch,
+                                                                         agent.actions_performed,
+                                                                         agent.epsilon,
+                                                                         best_epoch,
+                                                                         best_score,
+                                                                         best_lines,
+                                                                         best_actions))
+                        draw_clear_row(win, lines_cleared, dirty_rects)
+
+                    # Remove the cleared rows from the grid (once the effect has been drawn)
+                    remove_grid_rows(grid, lines_cleared, locked_positions)
 
                 # Update the score
                 score += score_increase
@@ -2465,7 +3118,7 @@ def main_ai_learn_old(win):
                     clock.tick()
 
             # Check if the game has ended
-            if check_defeat(locked_positions):
+            if game_over:
                 run = False
 
             # If an action has been taken, prepare everything to store the experience
@@ -2499,21 +3152,21 @@ def main_ai_learn_old(win):
 
             # Draw everything (original HUD and AI HUD) IF not in fast mode
             if not fast_training:
-                draw_manager(win, grid, current_piece, next_piece, score, level, lines)
-                draw_ai_learn_old_information(win,
-                                              hud_current_state,
-                                              hud_next_state,
-                                              hud_action,
-                                              hud_reward,
-                                              current_epoch,
-                                              agent.actions_performed,
-                                              agent.epsilon,
-                                              best_epoch,
-                                              best_score,
-                                              best_lines,
-                                              best_actions)
-                # Update the screen
-                pygame.display.flip()
+                dirty_rects = draw_manager(win, grid, current_piece, next_piece, score, level, lines)
+                dirty_rects.append(draw_ai_learn_old_information(win,
+                                                                 hud_current_state,
+                                                                 hud_next_state,
+                                                                 hud_action,
+                                                                 hud_reward,
+                                                                 current_epoch,
+                                                                 agent.actions_performed,
+                                                                 agent.epsilon,
+                                                                 best_epoch,
+                                                                 best_score,
+                                                                 best_lines,
+                                                                 best_actions))
+                # Update the areas of the screen that have changed
+                pygame.display.update(dirty_rects)
 
             # If the agent has cleared more than the specified amount, cut it short
             if lines >= max_lines_training:
@@ -2543,8 +3196,11 @@ def main_ai_player_new(win):
     """
 
     # Initialize all necessary variables
-    (locked_positions, _, score, lines, level, change_piece, run, randomizer_shapes, current_piece,
-     next_piece, clock, fall_time) = initialize_game()
+    (locked_positions, grid, row_masks, shape_pos, _, score, lines, level, change_piece, run,
+     randomizer_shapes, current_piece, next_piece, clock, fall_time) = initialize_game()
+
+    # The game cannot be lost until a piece has been locked
+    game_over = False
 
     # Current speed will be fixed to the specified value (and not updated)
     current_speed = game_speed_ai
@@ -2561,7 +3217,7 @@ def main_ai_player_new(win):
 
         # PRE-LOOP
         # Generate all possible actions for the current state and pieces
-        possible_actions = generate_possible_actions(locked_positions, current_piece)
+        possible_actions = generate_possible_actions(locked_positions, current_piece, row_masks)
 
         # Choose an action from the agent (and store the Q-Value)
         action, q_value = agent.act(possible_actions)
@@ -2572,23 +3228,22 @@ def main_ai_player_new(win):
         # Bool used to keep track of when the game loop should yield (to compute the next action)
         loop_ended = False
 
-        # Tick the clock (to "ignore" time lost during computations)
-        clock.tick()
+        # Tick the clock to "ignore" time lost during computations (the clock is only used if not in fast mode)
+        if not fast_training:
+            clock.tick()
 
         # GAME LOOP
         # The game loop will run until either the game is over, all steps have been taken or
         # the piece has been locked inside. This will be controled by a variable outside
         while not loop_ended:
 
-            # Create the grid and update all the clocks, marking a new tick
-            grid = create_grid(locked_positions)
-
             # Check if fast mode is active
             # NOT ACTIVE: The real-time clock is used
             if not fast_training:
-                fall_time += clock.get_rawtime()
-                poll_time += clock.get_rawtime()
-                clock.tick()
+                # (The loop is capped at max_fps, so the elapsed time includes the time spent waiting by the clock)
+                fall_time += clock.get_time()
+                poll_time += clock.get_time()
+                clock.tick(max_fps)
             # ACTIVE: automatically increase the counters by the polling speed
             else:
                 fall_time += polling_speed
@@ -2597,22 +3252,28 @@ def main_ai_player_new(win):
             # Unless specified otherwise, the piece is not going to be locked
             change_piece = False
 
-            # Check if the player has exited the game or has pressed the ESC key
-            for event in pygame.event.get():
+            # (In fast mode there is no window, so there are no events to check)
+            if not fast_training:
+                # Check if the player has exited the game or has pressed the ESC key
+                for event in pygame.event.get():
 
-                # Window has been closed
-                if event.type == pygame.QUIT:
-                    pygame.display.quit()
-                    pygame.quit()
-                    sys.exit()
+                    # Window has been closed
+                    if event.type == pygame.QUIT:
+                        pygame.display.quit()
+                        pygame.quit()
+                        sys.exit()
 
-                # Key has been pressed
-                if event.type == pygame.KEYDOWN:
+                    # Window has been uncovered: the whole screen is drawn again in the next frame
+                    if event.type == pygame.VIDEOEXPOSE:
+                        invalidate_screen()
 
-                    # ESC key (exit to main menu)
-                    if event.key == pygame.K_ESCAPE:
-                        run = False
-                        stop_sounds()
+                    # Key has been pressed
+                    if event.type == pygame.KEYDOWN:
+
+                        # ESC key (exit to main menu)
+                        if event.key == pygame.K_ESCAPE:
+                            run = False
+                            stop_sounds()
 
             # Clock calculations
             # The order of these calculations is relevant. The movement must always be polled first
@@ -2623,7 +3284,7 @@ def main_ai_player_new(win):
                 step = steps.popleft()
                 last_step = step
                 poll_time = 0
-                current_piece, grid, change_piece = process_inputs([step], current_piece, grid)
+                current_piece, change_piece = process_inputs([step], current_piece, row_masks)
 
                 # Notify the agent
                 agent.notify_step()
@@ -2632,33 +3293,44 @@ def main_ai_player_new(win):
             if fall_time > current_speed:
                 fall_time = 0
                 current_piece.y += 1
-                if not valid_space(current_piece, grid) and current_piece.y > 0:
+                if not valid_space(current_piece, row_masks) and current_piece.y > 0:
                     current_piece.y -= 1
                     change_piece = True
 
             # Place the current piece into the grid
-            grid, shape_pos = place_piece(current_piece, grid)
+            grid, shape_pos = place_piece(current_piece, grid, shape_pos, locked_positions)
 
             # If the piece has been locked in place
             if change_piece:
-                # Add the current piece to locked positions (conserving the biggest y value)
-                shape_y = -1
-                for pos in shape_pos:
-                    if pos[1] > shape_y:
-                        shape_y = pos[1]
-                    p = (pos[0], pos[1])
-                    locked_positions[p] = current_piece.color
+                # Store the biggest Y value of the current piece (the lowest row it reaches) to compute the score later
+                # It is known directly from the precomputed extent of the rotation (and it is never considered below -1)
+                shape_y = max(-1, current_piece.y + current_piece.masks[current_piece.rotation][4])
+
+                # Add the current piece to locked positions
+                color_index = current_piece.color_index
+                for x, y in shape_pos:
+                    locked_positions[y * 10 + x] = color_index
 
                 # Get the next piece
                 current_piece = next_piece
                 next_piece, randomizer_shapes = get_shape(randomizer_shapes)
 
-                # Update lines
+                # Update lines (the amount of cleared lines is stored, since it is used several times)
                 lines_cleared = clear_rows(grid, locked_positions)
-                lines += len(lines_cleared)
+                amount_cleared = len(lines_cleared)
+
+                # Check if the locked piece has reached the top of the screen
+                # (This is the only moment when the game can be lost)
+                game_over = check_defeat(shape_pos, lines_cleared)
+
+                # Update the bitboard with the new locked piece and the cleared lines
+                # (The locked piece stays in the grid, so it must not be removed from it the next tick)
+                update_row_masks(row_masks, shape_pos, lines_cleared, locked_positions)
+                shape_pos = []
+                lines += amount_cleared
 
                 # Compute the score increase
-                score_increase = compute_score(len(lines_cleared), shape_y, level)
+                score_increase = compute_score(amount_cleared, shape_y, level)
 
                 # Update level (speed is not increased in AI mode)
                 level = lines // 10
@@ -2667,20 +3339,23 @@ def main_ai_player_new(win):
                 play_sound("fall")
 
                 # Check if a line animation has to be played
-                if len(lines_cleared) > 0:
+                if amount_cleared > 0:
                     # Play the appropriate sound. Sound is played before the effect is drawn to ensure it's not delayed
                     play_sound("line")
 
                     # Draw the screen first (to ensure the piece is displayed on its proper place) and then draw the effect
                     if not fast_training:
-                        draw_manager(win, grid, current_piece, next_piece, score, level, lines - len(lines_cleared))
-                        draw_ai_player_new_information(win,
-                                                       action[2],
-                                                       q_value,
-                                                       last_step,
-                                                       agent.actions_performed,
-                                                       agent.displacements)
-                        draw_clear_row(win, lines_cleared)
+                        dirty_rects = draw_manager(win, grid, current_piece, next_piece, score, level, lines - amount_cleared)
+                        dirty_rects.append(draw_ai_player_new_information(win,
+                                                                          action[2],
+                                                                          q_value,
+                                                                          last_step,
+                                                                          agent.actions_performed,
+                                                                          agent.displacements))
+                        draw_clear_row(win, lines_cleared, dirty_rects)
+
+                    # Remove the cleared rows from the grid (once the effect has been drawn)
+                    remove_grid_rows(grid, lines_cleared, locked_positions)
 
                 # Update the score
                 score += score_increase
@@ -2688,23 +3363,24 @@ def main_ai_player_new(win):
                 # End the loop (to continue with either the pre-loop or finish the game)
                 loop_ended = True
 
-                # Prepare everything for the next loop
-                clock.tick()
+                # Prepare everything for the next loop (the clock is only used if not in fast mode)
+                if not fast_training:
+                    clock.tick()
 
             # Draw everything (original HUD and AI HUD)
             if not fast_training:
-                draw_manager(win, grid, current_piece, next_piece, score, level, lines)
-                draw_ai_player_new_information(win,
-                                               action[2],
-                                               q_value,
-                                               last_step,
-                                               agent.actions_performed,
-                                               agent.displacements)
-                # Update the screen
-                pygame.display.flip()
+                dirty_rects = draw_manager(win, grid, current_piece, next_piece, score, level, lines)
+                dirty_rects.append(draw_ai_player_new_information(win,
+                                                                  action[2],
+                                                                  q_value,
+                                                                  last_step,
+                                                                  agent.actions_performed,
+                                                                  agent.displacements))
+                # Update the areas of the screen that have changed
+                pygame.display.update(dirty_rects)
 
             # Check if the game has ended
-            if check_defeat(locked_positions):
+            if game_over:
                 if not fast_training:
                     stop_sounds()
                     play_sound("lost")
@@ -2761,8 +3437,11 @@ def main_ai_learn_new(win):
         # GAME START:
 
         # Initialize all necessary variables
-        (locked_positions, _, score, lines, level, change_piece, run, randomizer_shapes, current_piece,
-         next_piece, clock, fall_time) = initialize_game()
+        (locked_positions, grid, row_masks, shape_pos, _, score, lines, level, change_piece, run,
+         randomizer_shapes, current_piece, next_piece, clock, fall_time) = initialize_game()
+
+        # The game cannot be lost until a piece has been locked
+        game_over = False
 
         # Current speed will be fixed to the specified value (and not updated)
         current_speed = game_speed_ai
@@ -2775,7 +3454,7 @@ def main_ai_learn_new(win):
 
             # PRE-LOOP
             # Generate all possible actions for the current state and pieces
-            possible_actions = generate_possible_actions(locked_positions, current_piece)
+            possible_actions = generate_possible_actions(locked_positions, current_piece, row_masks)
 
             # Choose an action from the agent (and store the Q-Value)
             action, q_value = agent.act(possible_actions)
@@ -2789,7 +3468,7 @@ def main_ai_learn_new(win):
             # TRAINING RELATED VARIABLES:
             # Compute the initial state and score
             initial_state = generate_state(locked_positions, current_piece)
-            initial_score = compute_heuristic_state_score(locked_positions, current_piece, False)
+            initial_score = compute_heuristic_state_score(locked_positions, current_piece, False, row_masks)
 
             # Store the final state and the reward obtained
             final_state = action[2]
@@ -2801,23 +3480,22 @@ def main_ai_learn_new(win):
             # Store the depth at which the piece was locked
             final_piece_depth = 0
 
-            # Tick the clock (to "ignore" time lost during computations)
-            clock.tick()
+            # Tick the clock to "ignore" time lost during computations (the clock is only used if not in fast mode)
+            if not fast_training:
+                clock.tick()
 
             # GAME LOOP
             # The game loop will run until either the game is over, all steps have been taken or
             # the piece has been locked inside. This will be controled by a variable outside
             while not loop_ended:
 
-                # Create the grid
-                grid = create_grid(locked_positions)
-
                 # Check if fast mode is active
                 # NOT ACTIVE: The real-time clock is used
                 if not fast_training:
-                    fall_time += clock.get_rawtime()
-                    poll_time += clock.get_rawtime()
-                    clock.tick()
+                    # (The loop is capped at max_fps, so the elapsed time includes the time spent waiting by the clock)
+                    fall_time += clock.get_time()
+                    poll_time += clock.get_time()
+                    clock.tick(max_fps)
                 # ACTIVE: Automatically increase the counters by the polling speed
                 else:
                     fall_time += polling_speed
@@ -2826,14 +3504,20 @@ def main_ai_learn_new(win):
                 # Unless specified otherwise, the piece is not going to be locked
                 change_piece = False
 
-                # Check if the player has exited the game or has pressed the ESC key
-                for event in pygame.event.get():
+                # (In fast mode there is no window, so there are no events to check)
+                if not fast_training:
+                    # Check if the player has exited the game or has pressed the ESC key
+                    for event in pygame.event.get():
 
-                    # Window has been closed
-                    if event.type == pygame.QUIT:
-                        pygame.display.quit()
-                        pygame.quit()
-                        sys.exit()
+                        # Window has been closed
+                        if event.type == pygame.QUIT:
+                            pygame.display.quit()
+                            pygame.quit()
+                            sys.exit()
+
+                        # Window has been uncovered: the whole screen is drawn again in the next frame
+                        if event.type == pygame.VIDEOEXPOSE:
+                            invalidate_screen()
 
                 # Clock calculations
                 # The order of these calculations is relevant. The movement must always be polled first
@@ -2842,7 +3526,7 @@ def main_ai_learn_new(win):
                 # 1 - If needed, execute an action
                 if poll_time > polling_speed:
                     poll_time = 0
-                    current_piece, grid, change_piece = process_inputs([steps.popleft()], current_piece, grid)
+                    current_piece, change_piece = process_inputs([steps.popleft()], current_piece, row_masks)
 
                     # Notify the agent of the step
                     agent.notify_step()
@@ -2851,22 +3535,23 @@ def main_ai_learn_new(win):
                 if fall_time > current_speed:
                     fall_time = 0
                     current_piece.y += 1
-                    if not valid_space(current_piece, grid) and current_piece.y > 0:
+                    if not valid_space(current_piece, row_masks) and current_piece.y > 0:
                         current_piece.y -= 1
                         change_piece = True
 
                 # Place the current piece into the grid
-                grid, shape_pos = place_piece(current_piece, grid)
+                grid, shape_pos = place_piece(current_piece, grid, shape_pos, locked_positions)
 
                 # If the piece has been locked in place
                 if change_piece:
-                    # Add the current piece to locked positions (conserving the biggest y value)
-                    shape_y = -1
-                    for pos in shape_pos:
-                        if pos[1] > shape_y:
-                            shape_y = pos[1]
-                        p = (pos[0], pos[1])
-                        locked_positions[p] = current_piece.color
+                    # Store the biggest Y value of the current piece (the lowest row it reaches) to compute the score later
+                    # It is known directly from the precomputed extent of the rotation (and it is never considered below -1)
+                    shape_y = max(-1, current_piece.y + current_piece.masks[current_piece.rotation][4])
+
+                    # Add the current piece to locked positions
+                    color_index = current_piece.color_index
+                    for x, y in shape_pos:
+                        locked_positions[y * 10 + x] = color_index
 
                     # Store the depth
                     final_piece_depth = shape_y
@@ -2878,15 +3563,25 @@ def main_ai_learn_new(win):
                     current_piece = next_piece
                     next_piece, randomizer_shapes = get_shape(randomizer_shapes)
 
-                    # Update lines
+                    # Update lines (the amount of cleared lines is stored, since it is used several times)
                     lines_cleared = clear_rows(grid, locked_positions)
-                    lines += len(lines_cleared)
+                    amount_cleared = len(lines_cleared)
+
+                    # Check if the locked piece has reached the top of the screen
+                    # (This is the only moment when the game can be lost)
+                    game_over = check_defeat(shape_pos, lines_cleared)
+
+                    # Update the bitboard with the new locked piece and the cleared lines
+                    # (The locked piece stays in the grid, so it must not be removed from it the next tick)
+                    update_row_masks(row_masks, shape_pos, lines_cleared, locked_positions)
+                    shape_pos = []
+                    lines += amount_cleared
 
                     # Store the amount of cleared lines
-                    final_lines_cleared = len(lines_cleared)
+                    final_lines_cleared = amount_cleared
 
                     # Compute the score increase
-                    score_increase = compute_score(len(lines_cleared), shape_y, level)
+                    score_increase = compute_score(amount_cleared, shape_y, level)
 
                     # Update level (speed is not increased in AI mode)
                     level = lines // 10
@@ -2895,27 +3590,30 @@ def main_ai_learn_new(win):
                     play_sound("fall")
 
                     # Check if a line animation has to be played
-                    if len(lines_cleared) > 0:
+                    if amount_cleared > 0:
                         # Play the appropriate sound. Sound is played before the effect is drawn to ensure it's not delayed
                         play_sound("line")
 
                         # Draw the screen first (to ensure the piece is displayed on its proper place) and then draw the effect
                         if not fast_training:
-                            draw_manager(win, grid, current_piece, next_piece, score, level, lines - len(lines_cleared))
-                            draw_ai_learn_new_information(win,
-                                                          current_epoch,
-                                                          initial_state,
-                                                          final_state,
-                                                          q_value,
-                                                          agent.actions_performed,
-                                                          agent.displacements,
-                                                          agent.epsilon,
-                                                          best_epoch,
-                                                          best_lines,
-                                                          best_score,
-                                                          best_actions,
-                                                          best_steps)
-                            draw_clear_row(win, lines_cleared)
+                            dirty_rects = draw_manager(win, grid, current_piece, next_piece, score, level, lines - amount_cleared)
+                            dirty_rects.append(draw_ai_learn_new_information(win,
+                                                                             current_epoch,
+                                                                             initial_state,
+                                                                             final_state,
+                                                                             q_value,
+                                                                             agent.actions_performed,
+                                                                             agent.displacements,
+                                                                             agent.epsilon,
+                                                                             best_epoch,
+                                                                             best_lines,
+                                                                             best_score,
+                                                                             best_actions,
+                                                                             best_steps))
+                            draw_clear_row(win, lines_cleared, dirty_rects)
+
+                        # Remove the cleared rows from the grid (once the effect has been drawn)
+                        remove_grid_rows(grid, lines_cleared, locked_positions)
 
                     # Update the score
                     score += score_increase
@@ -2923,30 +3621,31 @@ def main_ai_learn_new(win):
                     # End the loop (to continue with either the pre-loop or finish the game)
                     loop_ended = True
 
-                    # Prepare everything for the next loop
-                    clock.tick()
+                    # Prepare everything for the next loop (the clock is only used if not in fast mode)
+                    if not fast_training:
+                        clock.tick()
 
                 # Draw everything (original HUD and AI HUD)
                 if not fast_training:
-                    draw_manager(win, grid, current_piece, next_piece, score, level, lines)
-                    draw_ai_learn_new_information(win,
-                                                  current_epoch,
-                                                  initial_state,
-                                                  final_state,
-                                                  q_value,
-                                                  agent.actions_performed,
-                                                  agent.displacements,
-                                                  agent.epsilon,
-                                                  best_epoch,
-                                                  best_lines,
-                                                  best_score,
-                                                  best_actions,
-                                                  best_steps)
-                    # Update the screen
-                    pygame.display.flip()
+                    dirty_rects = draw_manager(win, grid, current_piece, next_piece, score, level, lines)
+                    dirty_rects.append(draw_ai_learn_new_information(win,
+                                                                     current_epoch,
+                                                                     initial_state,
+                                                                     final_state,
+                                                                     q_value,
+                                                                     agent.actions_performed,
+                                                                     agent.displacements,
+                                                                     agent.epsilon,
+                                                                     best_epoch,
+                                                                     best_lines,
+                                                                     best_score,
+                                                                     best_actions,
+                                                                     best_steps))
+                    # Update the areas of the screen that have changed
+                    pygame.display.update(dirty_rects)
 
                 # Check if the game has ended
-                if check_defeat(locked_positions):
+                if game_over:
                     run = False
                     loop_ended = True
 
@@ -2999,16 +3698,25 @@ def menu_logic(win):
 
     run = True
 
+    # The menu is static, so it only needs to be drawn again after a game or when the window needs to be repainted
+    menu_dirty = True
+
     # While the game is not closed
     while run:
-        # Draw the main menu
-        draw_main_menu(win)
+        # Draw the main menu (if needed)
+        if menu_dirty:
+            draw_main_menu(win)
+            menu_dirty = False
 
         # Check for player inputs
-        for event in pygame.event.get():
+        # (The loop sleeps until an event arrives, instead of spinning while nothing happens)
+        for event in [pygame.event.wait()] + pygame.event.get():
             # If the window is closed, simply exit the loop
             if event.type == pygame.QUIT:
                 run = False
+            # If the window has been uncovered, draw the menu again
+            if event.type == pygame.VIDEOEXPOSE:
+                menu_dirty = True
             # If a key is pressed
             if event.type == pygame.KEYDOWN:
                 # If escape is pressed, close the game
@@ -3026,6 +3734,9 @@ def menu_logic(win):
                             main_ai_player_new(win)
                         pygame.event.clear()
 
+                    # The game has been drawn over the menu
+                    menu_dirty = True
+
     # When closed, exit everything in an ordered way
     pygame.display.quit()
     pygame.quit()
@@ -3125,6 +3836,7 @@ if __name__ == "__main__":
 
     parser.add_argument('-s',
                         '--seed',
+                        default=seed,
                         type=int,
                         help="Sets a seed for all random events. Note that reproducibility is not totally guaranteed "
                              "due to Keras.")
@@ -3144,6 +3856,7 @@ if __name__ == "__main__":
 
     parser.add_argument('-at',
                         '--agenttype',
+                        default=agent_type,
                         choices=['standard_new', 'prioritized_new', 'random_new',
                                  'standard_old', 'weighted_old', 'random_old',
                                  'el-tetris'],
@@ -3158,6 +3871,7 @@ if __name__ == "__main__":
 
     parser.add_argument('-w',
                         '--weights',
+                        default=weights,
                         help="(AI PLAYING ONLY) Loads the pre-trained weights in the specified file. If not set, "
                              "the random initial weights will be used instead")
 
@@ -3176,6 +3890,7 @@ if __name__ == "__main__":
 
     parser.add_argument('-er',
                         '--experiencereplay',
+                        default=experience_replay_size,
                         type=int,
                         help="(LEARNING ONLY) Sets how many experiences will be taken from the experience replay at "
                              "once while learning. DEFAULT = " + str(experience_replay_size))
@@ -3186,6 +3901,7 @@ if __name__ == "__main__":
 
     parser.add_argument('-b',
                         '--batchsize',
+                        default=batch_size,
                         type=int,
                         help="(LEARNING ONLY) Sets how many experiences will be taken from the experience replay at "
                              "once while learning. Cannot be bigger than the experience replay size. "
@@ -3200,6 +3916,7 @@ if __name__ == "__main__":
 
     parser.add_argument('-rw',
                         '--reward',
+                        default=rewards_method,
                         choices=['game', 'heuristic'],
                         help="(AI ONLY) Sets the method to be used to compute the reward for a state/action pair. "
                              "DEFAULT: " + rewards_method)
@@ -3210,6 +3927,7 @@ if __name__ == "__main__":
 
     parser.add_argument('-g',
                         '--gamma',
+                        default=gamma,
                         type=float,
                         help="(LEARNING ONLY) Sets a value for the gamma variable (discount factor, importance given "
                              "to future rewards in Q-learning). DEFAULT = " + str(gamma))
@@ -3220,6 +3938,7 @@ if __name__ == "__main__":
 
     parser.add_argument('-eps',
                         '--epsilon',
+                        default=epsilon,
                         type=float,
                         help="(LEARNING ONLY) Sets a value for the epsilon variable (initial chance to take a random "
                              "action during learning, part of exploration-exploitation). Must be between 0 and 1. "
@@ -3231,6 +3950,7 @@ if __name__ == "__main__":
 
     parser.add_argument('-epp',
                         '--epsilonpercentage',
+                        default=epsilon_percentage,
                         type=int,
                         help="(LEARNING ONLY) Sets a percentage of epochs after which the epsilon value will be "
                              "minimum. Epsilon will be decreased linearly from the maximum at 0%% epochs to the minimum "
@@ -3242,6 +3962,7 @@ if __name__ == "__main__":
 
     parser.add_argument('-mep',
                         '--minimumepsilon',
+                        default=minimum_epsilon,
                         type=float,
                         help="(LEARNING ONLY) Sets the minimum value for the epsilon variable. Epsilon value will not "
                              "go below this value. Value must be between 0 and the initial epsilon value. "
@@ -3253,6 +3974,7 @@ if __name__ == "__main__":
 
     parser.add_argument('-lr',
                         '--learningrate',
+                        default=learning_rate,
                         type=float,
                         help="(LEARNING ONLY) Sets a value for the learning rate (value given to new samples in the "
                              "neural network). DEFAULT = " + str(learning_rate))
@@ -3262,6 +3984,7 @@ if __name__ == "__main__":
 
     parser.add_argument('-epo',
                         '--epochs',
+                        default=total_epochs,
                         type=int,
                         help="(LEARNING ONLY) Sets the total amount of epochs to train the agent. Must be positive. "
                              "DEFAULT = " + str(total_epochs))
@@ -3269,6 +3992,11 @@ if __name__ == "__main__":
     # Parse the arguments
     arguments = vars(parser.parse_args())
 
+    # Find the arguments explicitly passed by the user, parsing them again without defaults (the rest are None)
+    # Only those are validated, since the default values are always valid
+    parser.set_defaults(**dict.fromkeys(arguments))
+    passed_arguments = {name for name, value in vars(parser.parse_args()).items() if value is not None}
+
     if arguments['silent']:
         sound_active = False
 
@@ -3285,86 +4013,92 @@ if __name__ == "__main__":
             # Train mode is always silent, turn off the sound
             sound_active = False
 
-    if arguments['seed'] is not None:
-        seed = arguments['seed']
-        # Sets the seed
-        random.seed(seed)
-
-    if arguments['agenttype'] is not None:
-        agent_type = arguments['agenttype']
-
-    if arguments['weights'] is not None:
-        weights = arguments['weights']
+    # All the arguments with a value default to the current value of their variable (set at the top of the script), so
+    # they can be assigned directly (a passed value of 0 or 0.0 is kept as is)
+    seed = arguments['seed']
+    agent_type = arguments['agenttype']
+    weights = arguments['weights']
+    experience_replay_size = arguments['experiencereplay']
+    batch_size = arguments['batchsize']
+    rewards_method = arguments['reward']
+    gamma = arguments['gamma']
+    epsilon = arguments['epsilon']
+    epsilon_percentage = arguments['epsilonpercentage']
+    minimum_epsilon = arguments['minimumepsilon']
+    learning_rate = arguments['learningrate']
+    total_epochs = arguments['epochs']
 
     if arguments['fast']:
         fast_training = True
 
-    if arguments['experiencereplay'] is not None:
-        experience_replay_size = arguments['experiencereplay']
-
-    if arguments['batchsize'] is not None:
-        batch_size = arguments['batchsize']
-        if batch_size < 1 or batch_size > experience_replay_size:
-            print("INVALID VALUE: Batch size must be between 1 and the maximum experience replay size. Passed: " + str(batch_size))
-            sys.exit()
-
-    if arguments['reward'] is not None:
-        rewards_method = arguments['reward']
-
-    if arguments['gamma'] is not None:
-        gamma = arguments['gamma']
+    # Sets the seed (if specified)
+    if seed is not None:
+        random.seed(seed)
 
-    if arguments['epsilon'] is not None:
-        epsilon = arguments['epsilon']
-        if epsilon < 0.0 or epsilon > 1.0:
-            print("INVALID VALUE: Epsilon  must be between 0.0 and 1.0. Passed: " + str(epsilon))
-            sys.exit()
+    # Validate the passed values, once all of them are known (the value of an argument may depend on another one)
+    if 'batchsize' in passed_arguments and (batch_size < 1 or batch_size > experience_replay_size):
+        print("INVALID VALUE: Batch size must be between 1 and the maximum experience replay size. Passed: " + str(batch_size))
+        sys.exit()
 
-    if arguments['epsilonpercentage'] is not None:
-        epsilon_percentage = arguments['epsilonpercentage']
-        if epsilon_percentage < 0 or epsilon_percentage > 100:
-            print("INVALID VALUE: Epsilon percentage must be between 0% and 100%. Passed: " + str(epsilon_percentage))
-            sys.exit()
+    if 'epsilon' in passed_arguments and (epsilon < 0.0 or epsilon > 1.0):
+        print("INVALID VALUE: Epsilon  must be between 0.0 and 1.0. Passed: " + str(epsilon))
+        sys.exit()
 
-    if arguments['minimumepsilon'] is not None:
-        minimum_epsilon = arguments['minimumepsilon']
-        if minimum_epsilon < 0.0 or minimum_epsilon > epsilon:
-            print("INVALID VALUE: Minimum epsilon must be between 0.0 and the specified initial value of epsilon (" + str(epsilon) + "). Passed: " + str(epsilon_percentage))
-            sys.exit()
+    if 'epsilonpercentage' in passed_arguments and (epsilon_percentage < 0 or epsilon_percentage > 100):
+        print("INVALID VALUE: Epsilon percentage must be between 0% and 100%. Passed: " + str(epsilon_percentage))
+        sys.exit()
 
-    if arguments['learningrate'] is not None:
-        learning_rate = arguments['learningrate']
+    if 'minimumepsilon' in passed_arguments and (minimum_epsilon < 0.0 or minimum_epsilon > epsilon):
+        print("INVALID VALUE: Minimum epsilon must be between 0.0 and the specified initial value of epsilon (" + str(epsilon) + "). Passed: " + str(minimum_epsilon))
+        sys.exit()
 
-    if arguments['epochs'] is not None:
-        total_epochs = arguments['epochs']
-        if total_epochs <= 0:
-            print("INVALID VALUE: Total number of epochs must be positive. Passed: " + str(total_epochs))
-            sys.exit()
+    if 'epochs' in passed_arguments and total_epochs <= 0:
+        print("INVALID VALUE: Total number of epochs must be positive. Passed: " + str(total_epochs))
+        sys.exit()
 
     # Initialize pygame
-    pygame.font.init()
-    pygame.mixer.pre_init(22050, -16, 2, 32)
-    pygame.init()
-    pygame.mixer.init()
-
-    # Prepare the game window
-    # (the window will be wider if an AI player is active, but only if fast mode is not active)
-    if ai_player and fast_training:
+    # (Silent AI players in fast mode have no window and play no sounds, so pygame is not initialized at all for them:
+    # the fonts, the display and the mixer would never be used)
+    if ai_player and fast_training and not sound_active:
         win = None
-    elif ai_player:
-        win = pygame.display.set_mode((screen_width + screen_width_extra, screen_height))
+
     else:
-        win = pygame.display.set_mode((screen_width, screen_height))
+        # (The mixer is only kept if the sound is active, e.g. it is never used while training)
+        pygame.font.init()
+        pygame.mixer.pre_init(22050, -16, 2, 32)
+        pygame.init()
+        if sound_active:
+            pygame.mixer.init()
+        else:
+            pygame.mixer.quit()
+
+        # Prepare the game window
+        # (the window will be wider if an AI player is active, but only if fast mode is not active)
+        if ai_player and fast_training:
+            win = None
+        elif ai_player:
+            win = pygame.display.set_mode((screen_width + screen_width_extra, screen_height))
+        else:
+            win = pygame.display.set_mode((screen_width, screen_height))
 
-    pygame.display.set_caption("DQL - TETRIS")
+        pygame.display.set_caption("DQL - TETRIS")
 
-    # If the sound is active, load the sounds (no need to otherwise)
+        # The game is only controlled with the keyboard (key presses), so the rest of the input events are blocked
+        # This way they are never queued, and the loops are not woken up by them (e.g. when the mouse moves over the
+        # window)
+        pygame.event.set_blocked([pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEWHEEL,
+                                  pygame.KEYUP, pygame.TEXTINPUT, pygame.TEXTEDITING,
+                                  pygame.FINGERMOTION, pygame.FINGERDOWN, pygame.FINGERUP])
+
+    # If the sound is active, load the sounds and the background song (no need to otherwise)
+    # (Everything is loaded only once, and kept in memory for all the games)
     if sound_active:
         sound_gallery = prepare_sounds([
             ("action", "beep.wav"),
             ("fall", "fall.wav"),
             ("line", "lineclear.ogg"),
             ("lost", "lost.ogg")])
+        pygame.mixer.music.load(path_song)
 
     # Start the appropriate logic, depending on the type of player (human, AI learning or AI playing)
 